@@ -1,15 +1,31 @@
 from flask import Flask, request, jsonify, send_file, render_template
 from flask_cors import CORS
 import os
+import sys
 from dotenv import load_dotenv
-import openai
 from werkzeug.utils import secure_filename
 import json
+import re
+import contextvars
+import zlib
+import hmac
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 import io
-from docx import Document
-from docx.shared import Pt
-import PyPDF2
+
+# Sibling modules are imported by plain name so this file works both as
+# backend.api.app (gunicorn) and as a top-level module (main.py, tests)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pdf_extractors
+import response_repair
+import usage_ledger
+import static_assets
+import memory_budget
+import llm_providers
+import result_store
+import extraction_pool
+import tracing
 
 # Load environment variables
 load_dotenv()
@@ -21,10 +37,19 @@ if not os.path.exists(frontend_path):
     # In Docker, frontend is at /app/frontend
     frontend_path = '/app/frontend'
 
-app = Flask(__name__,
-            template_folder=frontend_path,
-            static_folder=frontend_path,
-            static_url_path='')
+# Serve the fingerprinted, pre-compressed build from build_assets.py when it exists
+build_path = os.path.join(frontend_path, 'build')
+asset_manifest = static_assets.load_manifest(build_path)
+
+if asset_manifest:
+    app = Flask(__name__,
+                template_folder=build_path,
+                static_folder=None)
+else:
+    app = Flask(__name__,
+                template_folder=frontend_path,
+                static_folder=frontend_path,
+                static_url_path='')
 
 # CORS configuration for production and development
 # Get allowed origins from environment variable, defaulting to localhost for development
@@ -36,6 +61,8 @@ UPLOAD_FOLDER = 'uploads'
 OUTPUT_FOLDER = 'outputs'
 MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
 ALLOWED_EXTENSIONS = {'pdf'}
+# Largest (decompressed) paper text accepted by /api/analyze-text
+MAX_TEXT_SIZE = int(os.getenv('MAX_TEXT_SIZE', 2 * 1024 * 1024))
 
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = MAX_FILE_SIZE
@@ -48,11 +75,108 @@ os.makedirs(OUTPUT_FOLDER, exist_ok=True)
 openai_api_key = os.getenv('OPENAI_API_KEY')
 PORT = int(os.getenv('PORT', 5001))
 
-if not openai_api_key:
+# LLM provider ('openai', 'compatible' or 'recorded') and optional backup used for hedging
+LLM_PROVIDER = os.getenv('LLM_PROVIDER', 'openai')
+LLM_BACKUP_PROVIDER = os.getenv('LLM_BACKUP_PROVIDER') or None
+
+# Analysis mode: 'single' sends one call for all sections, 'parallel' sends one call per section
+ANALYSIS_MODE = os.getenv('ANALYSIS_MODE', 'single')
+ANALYSIS_MODES = {'single', 'parallel'}
+
+SYSTEM_PROMPT = "You are a research methodologist and domain expert specializing in analyzing academic papers."
+
+# Model settings per tier, used by parallel mode
+MODEL_TIERS = {
+    'fast': {'model': os.getenv('FAST_MODEL', 'gpt-5-nano'), 'reasoning_effort': 'minimal'},
+    'default': {'model': os.getenv('DEFAULT_MODEL', 'gpt-5-mini')},
+    'strong': {'model': os.getenv('STRONG_MODEL', 'gpt-5')},
+}
+
+# Tier per prompt.md section number; sections not listed use 'default'
+SECTION_TIERS = {
+    '1': 'fast',    # Full Citation
+    '4': 'fast',    # Methodology & Design
+    '8': 'strong',  # Critical Appraisal & Integration
+    '9': 'fast',    # Attributes and tags
+}
+
+# Tier each tier falls back to when the daily budget is running out
+CHEAPER_TIERS = {'strong': 'default', 'default': 'fast', 'fast': 'fast'}
+
+# Related papers from our own library added to the prompt for the 'Connections' appraisal
+RELATED_PAPERS = os.getenv('RELATED_PAPERS', 'true').lower() == 'true'
+RELATED_PAPERS_K = int(os.getenv('RELATED_PAPERS_K', 5))
+RELATED_PAPERS_MIN_SIMILARITY = float(os.getenv('RELATED_PAPERS_MIN_SIMILARITY', 0.1))
+
+# Characters of paper text kept in the 'reduced_text' budget mode
+REDUCED_TEXT_CHARS = int(os.getenv('REDUCED_TEXT_CHARS', 40000))
+
+if LLM_PROVIDER == 'openai' and not openai_api_key:
     print("Error: OPENAI_API_KEY not found. Please add it to your .env file.")
 
-# Initialize OpenAI client
-client_openai = openai.OpenAI(api_key=openai_api_key) if openai_api_key else None
+# Placeholders for sections that could not be generated; results containing them aren't reused
+SECTION_FAILED = "*Section generation failed:"
+SECTION_MISSING = "*Section missing: the response was cut off before this section.*"
+
+# Caches filled on first use (or by warm_up)
+_prompt_cache = {'mtime': None, 'text': None}
+_docx_template = None
+
+
+def get_llm_provider():
+    """Return the primary LLM provider; raises if it isn't configured."""
+    return llm_providers.get_provider(LLM_PROVIDER)
+
+
+def _warm_provider_clients():
+    """Create the providers' HTTP clients (this imports openai) ahead of the first request."""
+    for name in filter(None, [LLM_PROVIDER, LLM_BACKUP_PROVIDER]):
+        try:
+            provider = llm_providers.get_provider(name)
+        except llm_providers.ProviderNotConfigured as error:
+            print(f"Skipping warm-up of {name} provider: {error}")
+            continue
+        if hasattr(provider, 'client'):
+            provider.client()
+
+
+def warm_up():
+    """
+    Preload heavy modules and caches so the first request doesn't pay for them.
+
+    Meant to run once in the gunicorn master before workers fork (see
+    gunicorn.conf.py). Nothing here opens sockets or threads, so the state is
+    safe to inherit; the OpenAI client is still rebuilt per worker by
+    reset_after_fork.
+    """
+    global _docx_template
+
+    _warm_provider_clients()
+    load_prompt_template()
+
+    import docx
+    with open(os.path.join(os.path.dirname(docx.__file__), 'templates', 'default.docx'), 'rb') as file:
+        _docx_template = file.read()
+    create_docx_from_markdown("# Warm-up\n\n- **item**", "warm_up.docx")
+
+    # PDF backends are imported by the extraction workers started in reset_after_fork
+    if not extraction_pool.EXTRACTION_SANDBOX:
+        backends = pdf_extractors.available_backends()
+        if backends:
+            __import__(pdf_extractors.BACKEND_MODULES[backends[0]])
+
+    if RELATED_PAPERS:
+        import paper_index # noqa: F401
+
+
+def reset_after_fork():
+    """Give each forked worker its own LLM clients and extraction workers (neither is fork-safe)."""
+    llm_providers.reset()
+    extraction_pool.reset()
+    if extraction_pool.EXTRACTION_SANDBOX:
+        # Start them now so the first upload doesn't wait for a process spawn and PDF imports
+        extraction_pool.start()
+    _warm_provider_clients()
 
 
 def is_allowed_file(filename):
@@ -60,64 +184,556 @@ def is_allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
-def extract_text_from_pdf(pdf_path):
-    """Extract text content from PDF file."""
+def extract_text_from_pdf(pdf_path, backend=None):
+    """Extract text content from PDF file using the configured extraction backend."""
     try:
-        with open(pdf_path, 'rb') as file:
-            pdf_reader = PyPDF2.PdfReader(file)
-            text = ""
-            for page in pdf_reader.pages:
-                text += page.extract_text() + "\n"
-            return text
+        if extraction_pool.EXTRACTION_SANDBOX:
+            pages, backend_used, quality = extraction_pool.extract(pdf_path, backend)
+        else:
+            pages, backend_used, quality = pdf_extractors.extract_pages(pdf_path, backend)
+        print(f"Extracted {len(pages)} pages with {backend_used} (quality {quality:.2f})")
+        return "\n".join(pages) + "\n"
+    except extraction_pool.ExtractionKilled:
+        raise
     except Exception as error:
         raise Exception(f"Failed to extract text from PDF: {str(error)}")
 
 
 def load_prompt_template():
-    """Load the prompt template from prompt.md file."""
+    """Load the prompt template from prompt.md file, re-reading it only when it changes."""
     try:
         prompt_path = os.path.join(os.path.dirname(__file__), '..', '..', 'prompt.md')
-        with open(prompt_path, 'r', encoding='utf-8') as file:
-            return file.read()
+        mtime = os.path.getmtime(prompt_path)
+        if _prompt_cache['mtime'] != mtime:
+            with open(prompt_path, 'r', encoding='utf-8') as file:
+                _prompt_cache['text'] = file.read()
+            _prompt_cache['mtime'] = mtime
+        return _prompt_cache['text']
     except Exception as error:
         raise Exception(f"Failed to load prompt template: {str(error)}")
 
 
+def chat_completion(messages, tier='default', purpose='analysis'):
+    """
+    Send one chat completion and record its token usage in the ledger.
+
+    The tier is downgraded to a cheaper one when the request runs in a
+    reduced budget mode, and hedging to the backup provider is skipped then.
+    """
+    budget_mode = usage_ledger.current_budget_mode.get()
+    if budget_mode != 'normal':
+        tier = CHEAPER_TIERS[tier]
+
+    def record_usage(provider_name, model, usage, latency):
+        usage_ledger.record(provider_name, model, purpose, usage, latency)
+
+    with tracing.span('llm_call', purpose=purpose, model=MODEL_TIERS[tier]['model']) as attributes:
+        content = llm_providers.complete(
+            messages,
+            MODEL_TIERS[tier],
+            primary=LLM_PROVIDER,
+            backup=LLM_BACKUP_PROVIDER,
+            on_usage=record_usage,
+            allow_hedge=budget_mode == 'normal'
+        )
+        attributes['response_chars'] = len(content)
+    return content
+
+
+def find_related_papers(text_content):
+    """Return the most similar previously analyzed papers (numpy is only imported when enabled)."""
+    if not RELATED_PAPERS:
+        return []
+
+    import paper_index
+    try:
+        return paper_index.query(
+            [text_content],
+            k=RELATED_PAPERS_K,
+            min_similarity=RELATED_PAPERS_MIN_SIMILARITY,
+            exclude_hashes={paper_index.text_hash(text_content)}
+        )[0]
+    except Exception as error:
+        print(f"Related-paper lookup failed: {error}")
+        return []
+
+
+def add_related_papers_to_prompt(prompt_template, related_papers):
+    """Insert related papers into the prompt header, so both analysis modes see them."""
+    if not related_papers:
+        return prompt_template
+
+    library = "\n".join(f"- {paper['citation']}" for paper in related_papers)
+    context = (
+        "**MY LIBRARY:** Papers I have already analyzed that are most similar to this one. "
+        "Use them for **Connections** where relevant; do not invent others from my library.\n\n"
+        f"{library}\n\n"
+    )
+
+    header, marker, output_format = prompt_template.partition('**OUTPUT FORMAT**')
+    if not marker:
+        return f"{prompt_template}\n\n{context}"
+    return f"{header}{context}{marker}{output_format}"
+
+
+def index_paper(text_content, analysis):
+    """Add an analyzed paper to the related-paper index, keyed by its citation."""
+    if not RELATED_PAPERS:
+        return
+
+    citation = None
+    if isinstance(analysis, dict):
+        citation = analysis.get("1. Full Citation (APA 7th)")
+    if not isinstance(citation, str) or not citation.strip():
+        # Fall back to the first non-empty line of the paper (usually the title)
+        citation = next((line.strip() for line in text_content.splitlines() if line.strip()), "Untitled paper")
+
+    import paper_index
+    try:
+        paper_index.add_paper(text_content, citation.strip()[:500])
+    except Exception as error:
+        print(f"Failed to index paper: {error}")
+
+
+def reduce_text(text_content, max_chars=REDUCED_TEXT_CHARS):
+    """Shorten paper text for the 'reduced_text' budget mode, keeping the start and the end."""
+    if len(text_content) <= max_chars:
+        return text_content
+
+    # Front matter and methods are at the start, conclusions and limitations at the end
+    head = int(max_chars * 0.7)
+    tail = max_chars - head
+    # Slice from an index rather than text_content[-tail:], which is the whole text when tail is 0
+    return f"{text_content[:head]}\n\n[... text omitted ...]\n\n{text_content[len(text_content) - tail:]}"
+
+
 def analyze_with_openai(text_content, prompt_template):
     """Analyze document using OpenAI API."""
-    if not client_openai:
-        raise Exception("OpenAI API key not configured")
+    get_llm_provider()
 
     try:
         # Combine prompt template with document content
         full_prompt = f"{prompt_template}\n\n**INPUT:**\n{text_content}"
 
-        response = client_openai.chat.completions.create(
-            model="gpt-5-mini",
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are a research methodologist and domain expert specializing in analyzing academic papers."
-                },
-                {
-                    "role": "user",
-                    "content": full_prompt
-                }
-            ]
+        return chat_completion([
+            {
+                "role": "system",
+                "content": SYSTEM_PROMPT
+            },
+            {
+                "role": "user",
+                "content": full_prompt
+            }
+        ])
+
+    except Exception as error:
+        raise Exception(f"OpenAI API error: {str(error)}")
+
+
+def split_prompt_sections(prompt_template):
+    """
+    Split prompt.md into its shared header and numbered output sections.
+
+    Returns (header, sections) where sections is a list of (key, spec) and key
+    is the section heading used in the JSON output, e.g. '4. Methodology & Design'.
+    """
+    header, _, output_format = prompt_template.partition('**OUTPUT FORMAT**')
+    parts = re.split(r'^\*\*(\d+\.[^*\n]+)\*\*\s*$', output_format, flags=re.MULTILINE)
+
+    # parts = [preamble, key1, spec1, key2, spec2, ...]
+    sections = []
+    for i in range(1, len(parts) - 1, 2):
+        sections.append((parts[i].strip(), parts[i + 1].strip()))
+
+    return header.strip(), sections
+
+
+def build_sections_prompt(text_content, header, sections, existing_sections=None):
+    """
+    Build a prompt asking for only the given (key, spec) sections of prompt.md.
+
+    existing_sections, if given, are already-written sections included as
+    context so a regenerated section stays consistent with the rest.
+    """
+    specs = "\n\n".join(f"**{key}**\n\n{spec}" for key, spec in sections)
+    keys = ", ".join(f"\"{key}\"" for key, _ in sections)
+
+    context = ""
+    if existing_sections:
+        context = (
+            "**ALREADY WRITTEN SECTIONS** (for context and consistency only; do not repeat them):\n"
+            f"```json\n{json.dumps(existing_sections, ensure_ascii=False, indent=2)}\n```\n\n"
         )
 
-        return response.choices[0].message.content
+    # Paper text goes before the section instructions so the shared prefix can be prompt-cached
+    return (
+        f"{header}\n\n**INPUT:**\n{text_content}\n\n"
+        f"{context}"
+        f"**OUTPUT FORMAT** (Strict JSON): Produce ONLY the following section(s).\n\n"
+        f"{specs}\n\n"
+        f"Return a JSON object with exactly these keys: {keys}."
+    )
+
+
+def analyze_section_with_openai(text_content, header, key, spec, existing_sections=None, purpose='section'):
+    """Generate a single prompt.md section with the model tier configured for it."""
+    section_number = key.split('.', 1)[0]
+
+    content = chat_completion(
+        [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": build_sections_prompt(text_content, header, [(key, spec)], existing_sections)}
+        ],
+        tier=SECTION_TIERS.get(section_number, 'default'),
+        purpose=f'{purpose} {section_number}'
+    )
+
+    with tracing.span('parse', section=section_number):
+        parsed = parse_json_from_response(content)
+        if parsed is None:
+            parsed, _ = response_repair.repair_json(content)
+    if isinstance(parsed, dict):
+        if key in parsed:
+            return parsed[key]
+        if len(parsed) == 1:
+            return next(iter(parsed.values()))
+        return parsed
+
+    return content
+
+
+def analyze_sections_parallel(text_content, prompt_template):
+    """
+    Analyze document with one concurrent OpenAI call per prompt.md section.
+
+    Returns the merged analysis dict consumed by format_analysis_as_markdown, so
+    latency tracks the slowest section instead of the sum of all of them.
+    """
+    get_llm_provider()
+
+    header, sections = split_prompt_sections(prompt_template)
+    if not sections:
+        raise Exception("No numbered sections found in prompt template")
+
+    with ThreadPoolExecutor(max_workers=len(sections)) as executor:
+        futures = {
+            key: executor.submit(
+                contextvars.copy_context().run,
+                analyze_section_with_openai, text_content, header, key, spec
+            )
+            for key, spec in sections
+        }
+
+    analysis = {}
+    errors = []
+    for key, future in futures.items():
+        try:
+            analysis[key] = future.result()
+        except Exception as error:
+            errors.append(f"{key}: {error}")
+            analysis[key] = f"{SECTION_FAILED} {error}*"
+
+    if len(errors) == len(sections):
+        raise Exception(f"OpenAI API error: {errors[0]}")
+
+    return analysis
+
+
+def resolve_section_key(section, sections):
+    """Match a section given as its number ('8') or full heading to a prompt.md section key."""
+    section = str(section).strip()
+    for key, _ in sections:
+        if section == key or section == key.split('.', 1)[0]:
+            return key
+    return None
+
+
+def recover_analysis(response_text, text_content, prompt_template):
+    """
+    Turn a model response into the analysis dict, repairing it if it's broken.
+
+    Instead of re-running the whole analysis:
+    - a response that parses is returned as-is
+    - a malformed or truncated object is first repaired locally
+    - sections a truncated response never finished (including the cut-off
+      last one) are requested in one short follow-up call
+    - a malformed object that can't be repaired locally is sent back, without
+      the paper, to the fast model to be fixed
+
+    Returns (analysis, recovery) where recovery is 'none', 'local',
+    'continuation', 'repair_call' or 'failed'. On 'failed' the raw response
+    text is returned, as before.
+    """
+    parsed = parse_json_from_response(response_text)
+    if parsed is not None:
+        return parsed, 'none'
+
+    data, truncated = response_repair.repair_json(response_text)
+
+    if data is None:
+        candidate = response_repair.extract_json_candidate(response_text)
+        if truncated or candidate is None:
+            return response_text, 'failed'
+
+        try:
+            repaired = request_json_repair(candidate)
+        except Exception as error:
+            print(f"JSON repair call failed: {error}")
+            return response_text, 'failed'
+        return (repaired, 'repair_call') if repaired is not None else (response_text, 'failed')
 
+    if not truncated:
+        return data, 'local'
+
+    header, sections = split_prompt_sections(prompt_template)
+
+    # The last key of a truncated object holds a partial value, so regenerate it too
+    if data:
+        last_key = list(data)[-1]
+        if any(key == last_key for key, _ in sections):
+            del data[last_key]
+
+    missing = [(key, spec) for key, spec in sections if key not in data]
+    if not missing:
+        return data, 'local'
+
+    try:
+        data.update(continue_missing_sections(text_content, header, missing))
+        recovery = 'continuation'
     except Exception as error:
-        raise Exception(f"OpenAI API error: {str(error)}")
+        print(f"Continuation call failed: {error}")
+        recovery = 'local'
+
+    # Sections the continuation didn't return either are marked, so the result isn't reused as complete
+    for key, _ in missing:
+        data.setdefault(key, SECTION_MISSING)
+    return data, recovery
+
+
+def continue_missing_sections(text_content, header, missing):
+    """Request only the sections a truncated response didn't finish."""
+    print(f"Requesting {len(missing)} missing sections: {', '.join(key for key, _ in missing)}")
+
+    content = chat_completion(
+        [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": build_sections_prompt(text_content, header, missing)}
+        ],
+        purpose='continuation'
+    )
+
+    parsed = parse_json_from_response(content)
+    if parsed is None:
+        parsed, _ = response_repair.repair_json(content)
+    if not isinstance(parsed, dict):
+        raise Exception("Continuation response was not valid JSON")
+
+    return {key: parsed[key] for key, _ in missing if key in parsed}
+
+
+def request_json_repair(broken_json):
+    """
+    Ask the fast model to fix invalid JSON. Only the broken JSON is sent, not the paper.
+
+    Returns None unless the fixed object parses and keeps every top-level key of the broken one.
+    """
+    content = chat_completion(
+        [
+            {
+                "role": "system",
+                "content": "You fix invalid JSON. Return only the corrected JSON object, keeping every key and value unchanged."
+            },
+            {"role": "user", "content": broken_json}
+        ],
+        tier='fast',
+        purpose='json repair'
+    )
+
+    parsed = parse_json_from_response(content)
+    if parsed is None:
+        parsed, _ = response_repair.repair_json(content)
+    if not isinstance(parsed, dict):
+        return None
 
+    # The fix must keep every section of the broken object, not just return valid JSON
+    lost = [key for key in response_repair.top_level_keys(broken_json) if key not in parsed]
+    if lost:
+        print(f"JSON repair dropped {len(lost)} keys: {', '.join(lost)}")
+        return None
+    return parsed
+
+
+def is_complete_analysis(analysis):
+    """True unless a section holds a failed/missing placeholder instead of generated content."""
+    return not any(
+        isinstance(value, str) and (value.startswith(SECTION_FAILED) or value == SECTION_MISSING)
+        for value in analysis.values()
+    )
+
+
+def start_request_accounting():
+    """
+    Set up usage accounting for a request that calls the model.
+
+    Tags the ledger rows with the caller (X-Client-Id header, else the
+    remote address), starts an empty list of provider calls, and returns
+    today's budget status, whose mode picks the models for this request.
+    """
+    usage_ledger.current_client.set(request.headers.get('X-Client-Id') or request.remote_addr or 'unknown')
+    budget = usage_ledger.budget_status()
+    usage_ledger.current_budget_mode.set(budget['mode'])
+    llm_providers.current_calls.set([])
+    if budget['mode'] != 'normal':
+        print(f"Daily budget at ${budget['spent_today_usd']:.2f} of ${budget['daily_budget_usd']:.2f}, running in {budget['mode']} mode")
+    return budget
+
+
+def providers_used():
+    """Comma-separated providers that answered this request's calls (LLM_PROVIDER if none were made)."""
+    return ', '.join(sorted({call['provider'] for call in llm_providers.current_calls.get()})) or LLM_PROVIDER
+
+
+def fit_paper_text(text_content, mode, budget, memory):
+    """
+    The paper text (and mode) to send, after the budget mode's and the memory budget's reductions.
+
+    Shared by analysis and regeneration, so a section is regenerated from
+    the same text the analysis used. Downgrades are noted in the memory report.
+    """
+    with tracing.span('reduce') as attributes:
+        paper_text = text_content
+        if budget['mode'] == 'reduced_text':
+            paper_text = reduce_text(text_content)
+
+        # Downgrade oversized text before building prompts: one call instead of nine, then shorter text
+        # (a budget of 0 disables the checks)
+        budget_bytes = memory_budget.MEMORY_BUDGET_MB * memory_budget.MB
+        if budget_bytes and memory_budget.estimate_text_memory(paper_text, mode) > budget_bytes:
+            if mode == 'parallel':
+                mode = 'single'
+                memory['downgrades'].append('parallel -> single mode')
+            if memory_budget.estimate_text_memory(paper_text, mode) > budget_bytes:
+                max_chars = memory_budget.max_text_chars(paper_text, mode)
+                paper_text = reduce_text(paper_text, max_chars)
+                memory['downgrades'].append(f'text reduced to {max_chars} characters')
+        attributes.update(chars=len(paper_text), mode=mode)
+
+    return paper_text, mode
+
+
+def analysis_settings_hash():
+    """Hash of the settings besides the text that shape an analysis: prompt.md, model tiers and providers."""
+    settings = {
+        'prompt': load_prompt_template(),
+        'model_tiers': MODEL_TIERS,
+        'section_tiers': SECTION_TIERS,
+        'providers': [LLM_PROVIDER, LLM_BACKUP_PROVIDER, llm_providers.COMPATIBLE_MODEL]
+    }
+    return result_store.text_hash(json.dumps(settings, sort_keys=True))[:16]
+
+
+def analyze_paper_text(text_content, mode, budget, memory, filename):
+    """
+    Analyze extracted paper text and store the result.
+
+    Shared by the PDF and text upload endpoints. Returns the JSON response
+    fields; a paper whose text and mode match a stored result is served from
+    the store without calling the model (only complete results produced in
+    the same budget mode, with the same prompt, models and providers, are
+    reused).
+    """
+    tracing.annotate(mode=mode, text_chars=len(text_content), budget_mode=budget['mode'])
+
+    content_hash = result_store.text_hash(text_content)
+    settings_hash = analysis_settings_hash()
+    cached_id = result_store.find(content_hash, settings_hash, mode, budget['mode'])
+    if cached_id:
+        try:
+            _, analysis_result, meta = result_store.load(cached_id)
+            print(f"Serving stored result {cached_id} for identical text")
+            tracing.annotate(cached=True)
+            return {
+                'success': True,
+                'markdown': create_markdown_from_analysis(analysis_result),
+                'provider': 'cache',
+                'hedged_calls': 0,
+                'analysis_mode': mode,
+                'recovery': 'none',
+                'budget': budget,
+                'related_papers': [
+                    {'citation': paper['citation'], 'similarity': paper['similarity']}
+                    for paper in meta.get('related_papers', [])
+                ],
+                'memory': memory,
+                'result_id': cached_id,
+                'sections': list(analysis_result),
+                'cached': True
+            }
+        except (result_store.ResultNotFound, OSError, ValueError):
+            pass
+
+    requested_mode = mode
+    paper_text, mode = fit_paper_text(text_content, mode, budget, memory)
+
+    # Load prompt template
+    with memory_budget.stage(memory, 'prompt'):
+        related_papers = find_related_papers(text_content)
+        prompt_template = add_related_papers_to_prompt(load_prompt_template(), related_papers)
+
+    # Analyze with OpenAI
+    with memory_budget.stage(memory, 'llm'):
+        if mode == 'parallel':
+            analysis_result = analyze_sections_parallel(paper_text, prompt_template)
+            recovery = 'none'
+        else:
+            analysis_result = analyze_with_openai(paper_text, prompt_template)
+            with tracing.span('parse') as attributes:
+                analysis_result, recovery = recover_analysis(analysis_result, paper_text, prompt_template)
+                attributes['recovery'] = recovery
+
+    index_paper(text_content, analysis_result)
+
+    # Create markdown output
+    with memory_budget.stage(memory, 'render'):
+        markdown_output = create_markdown_from_analysis(analysis_result)
 
+    # Keep text and parsed analysis so single sections can be regenerated later
+    result_id = None
+    if isinstance(analysis_result, dict):
+        try:
+            result_id = result_store.save(text_content, analysis_result, {
+                'filename': filename,
+                'mode': requested_mode,
+                'budget_mode': budget['mode'],
+                'related_papers': related_papers
+            })
+            # Only reuse complete results, so one failed call isn't replayed for the whole TTL
+            if is_complete_analysis(analysis_result):
+                result_store.remember(result_id, content_hash, settings_hash, requested_mode, budget['mode'])
+        except OSError as error:
+            print(f"Failed to store result: {error}")
+
+    return {
+        'success': True,
+        'markdown': markdown_output,
+        'provider': providers_used(),
+        'hedged_calls': sum(call['hedged'] for call in llm_providers.current_calls.get()),
+        'analysis_mode': mode,
+        'recovery': recovery,
+        'budget': budget,
+        'related_papers': [
+            {'citation': paper['citation'], 'similarity': paper['similarity']}
+            for paper in related_papers
+        ],
+        'memory': memory,
+        'result_id': result_id,
+        'sections': list(analysis_result) if isinstance(analysis_result, dict) else [],
+        'cached': False
+    }
 
 
 def parse_json_from_response(response_text):
     """Extract and parse JSON from AI response."""
-    import re
-
     # Try to find JSON block in markdown code fence (use greedy matching to get full JSON)
     json_match = re.search(r'```json\s*(\{.*\})\s*```', response_text, re.DOTALL)
     if json_match:
@@ -523,9 +1139,12 @@ def create_markdown_from_analysis(analysis_text):
 def create_docx_from_markdown(markdown_content, filename):
     """Create a DOCX file from markdown content with improved formatting."""
     import re
+    from docx import Document
+    from docx.shared import Pt
 
     try:
-        doc = Document()
+        # Reuse the default template bytes cached by warm_up when available
+        doc = Document(io.BytesIO(_docx_template)) if _docx_template else Document()
 
         # Set default font
         style = doc.styles['Normal']
@@ -614,7 +1233,50 @@ def add_formatted_text(paragraph, text):
 @app.route('/')
 def index():
     """Serve the frontend application."""
-    return render_template('index.html')
+    response = app.make_response(render_template('index.html'))
+    # Always revalidate so new asset fingerprints are picked up right away
+    response.headers['Cache-Control'] = static_assets.REVALIDATE_CACHE
+    return response
+
+
+if asset_manifest:
+    @app.route('/<path:filename>')
+    def built_asset(filename):
+        """Serve built frontend assets, pre-compressed when the client accepts it."""
+        return static_assets.send_asset(build_path, filename, asset_manifest, request.headers.get('Accept-Encoding'))
+
+
+@app.after_request
+def compress_dynamic_response(response):
+    """Compress JSON and HTML responses for clients that accept it."""
+    return static_assets.compress_response(response, request.headers.get('Accept-Encoding'))
+
+
+@app.before_request
+def start_request_trace():
+    tracing.start_trace(f"{request.method} {request.path}")
+
+
+@app.after_request
+def finish_request_trace(response):
+    """Tag every response with its trace id (and JSON errors with the failed stage), then store the trace."""
+    trace = tracing.current_trace.get()
+    if trace is None:
+        return response
+
+    response.headers['X-Trace-Id'] = trace.trace_id
+    if response.is_json and not response.direct_passthrough:
+        data = response.get_json(silent=True)
+        if isinstance(data, dict):
+            # Keep the trace_id of a trace record returned by /api/traces
+            data.setdefault('trace_id', trace.trace_id)
+            failed = trace.failed_span()
+            if response.status_code >= 400 and failed:
+                data['failed_stage'] = failed['name']
+            response.set_data(app.json.dumps(data))
+
+    tracing.finish_trace(trace, response.status_code)
+    return response
 
 
 @app.route('/api/health', methods=['GET'])
@@ -622,7 +1284,9 @@ def health_check():
     """Health check endpoint."""
     return jsonify({
         'status': 'healthy',
-        'openai_configured': client_openai is not None
+        'openai_configured': openai_api_key is not None,
+        'llm_provider': LLM_PROVIDER,
+        'extraction': extraction_pool.stats() if extraction_pool.EXTRACTION_SANDBOX else None
     })
 
 
@@ -642,35 +1306,46 @@ def analyze_document():
         if not is_allowed_file(file.filename):
             return jsonify({'error': 'Invalid file type. Only PDF files are allowed.'}), 400
 
+        # Optional per-request extraction backend, defaults to PDF_EXTRACTOR
+        extractor = request.form.get('extractor') or None
+        if extractor and extractor != 'auto' and extractor not in pdf_extractors.EXTRACTORS:
+            return jsonify({'error': f'Unknown extractor: {extractor}'}), 400
+
+        # Optional per-request analysis mode, defaults to ANALYSIS_MODE
+        mode = request.form.get('mode') or ANALYSIS_MODE
+        if mode not in ANALYSIS_MODES:
+            return jsonify({'error': f'Unknown analysis mode: {mode}'}), 400
+
+        # Tag usage with the caller and pick models based on today's spend
+        budget = start_request_accounting()
+
+        memory = memory_budget.new_report()
+
         # Save uploaded file
         filename = secure_filename(file.filename) # type: ignore
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         unique_filename = f"{timestamp}_{filename}"
         file_path = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
-        file.save(file_path)
+        with memory_budget.stage(memory, 'upload'):
+            file.save(file_path)
 
         try:
-            # Extract text from PDF
-            text_content = extract_text_from_pdf(file_path)
+            # Reject PDFs that can't be extracted within the memory budget before trying
+            # (sandboxed extraction has its own memory cap in the worker process, on Linux)
+            if not extraction_pool.EXTRACTION_SANDBOX or not extraction_pool.MEMORY_LIMIT_ENFORCED:
+                memory_budget.check_pdf_size(os.path.getsize(file_path), pdf_extractors.page_count(file_path))
 
-            # Load prompt template
-            prompt_template = load_prompt_template()
-
-            # Analyze with OpenAI
-            analysis_result = analyze_with_openai(text_content, prompt_template)
+            # Extract text from PDF
+            with memory_budget.stage(memory, 'extract'):
+                text_content = extract_text_from_pdf(file_path, extractor)
 
-            # Create markdown output
-            markdown_output = create_markdown_from_analysis(analysis_result)
+            result = analyze_paper_text(text_content, mode, budget, memory, filename)
 
             # Clean up uploaded file
             os.remove(file_path)
+            memory_budget.log_report(memory, unique_filename)
 
-            return jsonify({
-                'success': True,
-                'markdown': markdown_output,
-                'provider': 'openai',
-                'timestamp': timestamp
-            })
+            return jsonify(dict(result, timestamp=timestamp))
 
         except Exception as processing_error:
             # Clean up on error
@@ -678,6 +1353,158 @@ def analyze_document():
                 os.remove(file_path)
             raise processing_error
 
+    except memory_budget.MemoryBudgetExceeded as error:
+        return jsonify({'error': str(error)}), 413
+
+    except extraction_pool.ExtractionKilled as error:
+        return jsonify({'error': str(error)}), 422
+
+    except Exception as error:
+        return jsonify({'error': str(error)}), 500
+
+
+@app.route('/api/analyze-text', methods=['POST'])
+def analyze_text_document():
+    """
+    Analyze text the browser already extracted from a PDF.
+
+    The body is UTF-8 text with pages separated by form feeds, optionally
+    gzip-compressed (Content-Encoding: gzip). Text that looks garbled gets a
+    422 with 'fallback': 'pdf' so the client can upload the PDF instead.
+    """
+    try:
+        mode = request.args.get('mode') or ANALYSIS_MODE
+        if mode not in ANALYSIS_MODES:
+            return jsonify({'error': f'Unknown analysis mode: {mode}'}), 400
+
+        filename = secure_filename(request.args.get('filename') or '') or 'paper.pdf'
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        memory = memory_budget.new_report()
+
+        with memory_budget.stage(memory, 'upload'):
+            body = request.get_data(cache=False)
+            if request.headers.get('Content-Encoding', '').lower() == 'gzip':
+                # Bounded decompression so a small body can't expand past MAX_TEXT_SIZE
+                decompressor = zlib.decompressobj(wbits=31)
+                try:
+                    body = decompressor.decompress(body, MAX_TEXT_SIZE + 1)
+                except zlib.error:
+                    return jsonify({'error': 'Invalid gzip body'}), 400
+            if len(body) > MAX_TEXT_SIZE:
+                return jsonify({'error': f'Text exceeds {MAX_TEXT_SIZE // 1024} KB limit'}), 413
+            try:
+                pages = body.decode('utf-8').split('\f')
+            except UnicodeDecodeError:
+                return jsonify({'error': 'Text must be UTF-8'}), 400
+
+        quality = pdf_extractors.text_quality(pages)
+        if quality < pdf_extractors.MIN_QUALITY_SCORE:
+            return jsonify({
+                'error': 'Could not read enough text from this PDF in the browser',
+                'fallback': 'pdf'
+            }), 422
+        print(f"Received {len(pages)} pages of browser-extracted text ({len(body)} bytes, quality {quality:.2f})")
+        text_content = "\n".join(pages) + "\n"
+
+        # Tag usage with the caller and pick models based on today's spend
+        budget = start_request_accounting()
+
+        result = analyze_paper_text(text_content, mode, budget, memory, filename)
+        memory_budget.log_report(memory, f"{timestamp}_{filename} (text)")
+
+        return jsonify(dict(result, timestamp=timestamp))
+
+    except memory_budget.MemoryBudgetExceeded as error:
+        return jsonify({'error': str(error)}), 413
+
+    except Exception as error:
+        return jsonify({'error': str(error)}), 500
+
+
+def traces_allowed():
+    """Traces expose errors and timings: require TRACES_TOKEN if set, else debug mode or a local client."""
+    if tracing.TRACES_TOKEN:
+        return hmac.compare_digest(request.headers.get('X-Traces-Token', ''), tracing.TRACES_TOKEN)
+    if os.getenv('FLASK_DEBUG', 'False').lower() == 'true':
+        return True
+    return request.remote_addr in ('127.0.0.1', '::1')
+
+
+@app.route('/api/traces', methods=['GET'])
+def list_traces():
+    """Slowest recent traces, overall or by one stage (?stage=llm_call), or one full trace (?trace_id=...)."""
+    if not traces_allowed():
+        return jsonify({'error': 'Traces are not available'}), 403
+
+    trace_id = request.args.get('trace_id')
+    if trace_id:
+        record = tracing.find(trace_id)
+        if record is None:
+            return jsonify({'error': 'Trace not found'}), 404
+        return jsonify(record)
+
+    try:
+        limit = min(int(request.args.get('limit', 10)), 100)
+        window = int(request.args.get('window', tracing.TRACE_QUERY_WINDOW))
+    except ValueError:
+        return jsonify({'error': 'limit and window must be integers'}), 400
+    if limit < 1 or window < 1:
+        return jsonify({'error': 'limit and window must be at least 1'}), 400
+
+    stage = request.args.get('stage') or None
+    return jsonify({
+        'stage': stage,
+        'traces': tracing.slowest(stage, limit=limit, window=window)
+    })
+
+
+@app.route('/api/regenerate', methods=['POST'])
+def regenerate_section():
+    """Regenerate one section of a stored result from its cached text and the other sections."""
+    try:
+        data = request.get_json(silent=True) or {}
+        result_id = data.get('result_id')
+        section = data.get('section')
+
+        if not result_id or not section:
+            return jsonify({'error': 'result_id and section are required'}), 400
+
+        budget = start_request_accounting()
+
+        text_content, analysis, meta = result_store.load(result_id)
+
+        prompt_template = add_related_papers_to_prompt(load_prompt_template(), meta.get('related_papers', []))
+        header, sections = split_prompt_sections(prompt_template)
+        key = resolve_section_key(section, sections)
+        if key is None:
+            return jsonify({'error': f'Unknown section: {section}'}), 400
+
+        # One section at a time holds about as much text as single mode
+        memory = memory_budget.new_report()
+        paper_text, _ = fit_paper_text(text_content, 'single', budget, memory)
+        existing_sections = {name: value for name, value in analysis.items() if name != key}
+
+        analysis[key] = analyze_section_with_openai(
+            paper_text, header, key, dict(sections)[key],
+            existing_sections=existing_sections,
+            purpose='regenerate'
+        )
+        result_store.save_analysis(result_id, analysis)
+
+        return jsonify({
+            'success': True,
+            'result_id': result_id,
+            'section': key,
+            'section_markdown': format_analysis_as_markdown({key: analysis[key]}),
+            'markdown': create_markdown_from_analysis(analysis),
+            'provider': providers_used(),
+            'budget': budget,
+            'memory': memory
+        })
+
+    except result_store.ResultNotFound as error:
+        return jsonify({'error': str(error)}), 404
+
     except Exception as error:
         return jsonify({'error': str(error)}), 500
 
@@ -705,7 +1532,10 @@ def download_file(format):
 
         elif format == 'docx':
             # Create and return DOCX file
-            docx_stream = create_docx_from_markdown(content, filename)
+            memory = memory_budget.new_report()
+            with memory_budget.stage(memory, 'docx'):
+                docx_stream = create_docx_from_markdown(content, filename)
+            memory_budget.log_report(memory, filename)
             return send_file(
                 docx_stream,
                 mimetype='application/vnd.openxmlformats-officedocument.wordprocessingml.document',
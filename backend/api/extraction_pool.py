@@ -0,0 +1,270 @@
+"""
+Sandboxed PDF extraction in a supervised pool of subprocess workers.
+
+Malformed or adversarial PDFs can make a parser spin for minutes or balloon
+in memory. Running extraction in reusable worker processes lets the web
+worker enforce a per-document wall-clock limit (EXTRACTION_TIMEOUT) and
+memory limit (EXTRACTION_MAX_RSS_MB): a worker that exceeds either is killed
+and replaced, and the request fails fast with a clear error while the web
+worker keeps serving. The memory limit is enforced twice: as a hard
+RLIMIT_AS cap on the worker's address space growth, so allocations past it
+fail immediately, and by polling the worker's RSS. Both need Linux (the
+resource module and /proc); elsewhere (macOS, Windows) workers only get the
+time limit, and app.py checks the PDF size against the memory budget
+before extracting instead.
+
+Workers are spawned (not forked), started by start() in each web worker
+right after fork (or on first use), import the PDF libraries while idle,
+and are replaced as soon as one is killed or has handled EXTRACTION_MAX_JOBS
+documents, so extractions don't pay for process start-up.
+"""
+
+import os
+import time
+import queue
+import threading
+import multiprocessing
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows
+    resource = None
+
+EXTRACTION_SANDBOX = os.getenv('EXTRACTION_SANDBOX', 'true').lower() == 'true'
+EXTRACTION_WORKERS = int(os.getenv('EXTRACTION_WORKERS', 1))
+EXTRACTION_TIMEOUT = float(os.getenv('EXTRACTION_TIMEOUT', 30))
+EXTRACTION_MAX_RSS_MB = float(os.getenv('EXTRACTION_MAX_RSS_MB', 150))
+EXTRACTION_MAX_JOBS = int(os.getenv('EXTRACTION_MAX_JOBS', 50))
+
+POLL_INTERVAL = 0.05
+
+_context = multiprocessing.get_context('spawn')
+
+# Whether EXTRACTION_MAX_RSS_MB can be enforced on this platform
+MEMORY_LIMIT_ENFORCED = resource is not None and os.path.exists('/proc/self/statm')
+
+
+class ExtractionKilled(Exception):
+    """Raised when a document exceeded its time or memory limit and its worker was killed."""
+
+
+def _worker_main(connection, max_rss_mb):
+    """Worker loop: extract (pdf_path, backend) jobs until the pipe closes."""
+    import pdf_extractors
+
+    # Import the first backend now so the first document doesn't wait for it
+    backends = pdf_extractors.available_backends()
+    if backends:
+        __import__(pdf_extractors.BACKEND_MODULES[backends[0]])
+
+    # Hard cap: address space may grow by at most max_rss_mb past what the imports use
+    if MEMORY_LIMIT_ENFORCED:
+        try:
+            with open('/proc/self/statm', 'r') as file:
+                address_space = int(file.read().split()[0]) * os.sysconf('SC_PAGE_SIZE')
+            limit = address_space + int(max_rss_mb * 1024 * 1024)
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+        except (OSError, ValueError) as error:
+            print(f"PDF extraction worker runs without a memory cap: {error}")
+
+    while True:
+        try:
+            pdf_path, backend = connection.recv()
+        except EOFError:
+            return
+        try:
+            connection.send(('ok', pdf_extractors.extract_pages(pdf_path, backend)))
+        except MemoryError:
+            connection.send(('memory', None))
+            return
+        except Exception as error:
+            connection.send(('error', str(error)))
+
+
+def _rss_bytes(pid):
+    """Resident memory of a worker, or 0 where /proc isn't available."""
+    try:
+        with open(f'/proc/{pid}/statm', 'r') as file:
+            return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+class _Worker:
+    def __init__(self):
+        self.connection, child_connection = _context.Pipe()
+        self.process = _context.Process(
+            target=_worker_main, args=(child_connection, EXTRACTION_MAX_RSS_MB), daemon=True
+        )
+        self.process.start()
+        child_connection.close()
+        self.jobs = 0
+
+    def kill(self):
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join(timeout=1)
+        self.connection.close()
+
+
+_idle = queue.Queue()
+_lock = threading.Lock()
+_started = 0
+
+counters = {
+    'completed': 0,
+    'failed': 0,
+    'killed_timeout': 0,
+    'killed_memory': 0,
+    'crashed': 0,
+}
+
+
+def stats():
+    return dict(counters, workers=_started)
+
+
+def _count(name):
+    with _lock:
+        counters[name] += 1
+
+
+def _acquire():
+    """Take an idle worker, starting one if the pool isn't full yet."""
+    global _started
+
+    try:
+        return _idle.get_nowait()
+    except queue.Empty:
+        pass
+
+    with _lock:
+        if _started < EXTRACTION_WORKERS:
+            _started += 1
+            start_new = True
+        else:
+            start_new = False
+
+    if start_new:
+        try:
+            return _Worker()
+        except Exception:
+            with _lock:
+                _started -= 1
+            raise
+    return _idle.get()
+
+
+def start():
+    """Start the pool's workers ahead of the first extraction (call after fork)."""
+    global _started
+
+    while True:
+        with _lock:
+            if _started >= EXTRACTION_WORKERS:
+                return
+            _started += 1
+        try:
+            _idle.put(_Worker())
+        except Exception as error:
+            with _lock:
+                _started -= 1
+            print(f"Failed to start PDF extraction worker: {error}")
+            return
+
+
+def _discard(worker):
+    """Kill a worker and start its replacement right away, so it's warm by the next document."""
+    global _started
+
+    worker.kill()
+    with _lock:
+        _started -= 1
+    start()
+
+
+def _release(worker):
+    worker.jobs += 1
+    if worker.jobs >= EXTRACTION_MAX_JOBS:
+        _discard(worker)
+    else:
+        _idle.put(worker)
+
+
+def extract(pdf_path, backend=None, timeout=None):
+    """
+    Extract page texts in a sandboxed worker.
+
+    Returns (pages, backend_name, quality_score) like pdf_extractors.extract_pages.
+    Raises ExtractionKilled if the document hit a limit, Exception on parser errors.
+    """
+    timeout = timeout or EXTRACTION_TIMEOUT
+    max_rss = EXTRACTION_MAX_RSS_MB * 1024 * 1024
+
+    worker = _acquire()
+    try:
+        worker.connection.send((os.path.abspath(pdf_path), backend))
+    except (OSError, EOFError):
+        _discard(worker)
+        _count('crashed')
+        raise Exception("PDF extraction worker is unavailable, please retry")
+
+    deadline = time.monotonic() + timeout
+    while True:
+        if worker.connection.poll(POLL_INTERVAL):
+            try:
+                status, payload = worker.connection.recv()
+            except (OSError, EOFError):
+                _discard(worker)
+                _count('crashed')
+                raise ExtractionKilled("PDF extraction worker crashed on this file")
+
+            if status == 'memory':
+                _discard(worker)
+                _count('killed_memory')
+                print(f"PDF extraction hit the {max_rss / 1024 / 1024:.0f} MB memory cap: {os.path.basename(pdf_path)}")
+                raise ExtractionKilled(_memory_message(max_rss))
+
+            _release(worker)
+            if status == 'ok':
+                _count('completed')
+                return payload
+            _count('failed')
+            raise Exception(payload)
+
+        if not worker.process.is_alive():
+            _discard(worker)
+            _count('crashed')
+            raise ExtractionKilled("PDF extraction worker crashed on this file")
+
+        if time.monotonic() > deadline:
+            _discard(worker)
+            _count('killed_timeout')
+            print(f"Killed PDF extraction after {timeout:.0f}s: {os.path.basename(pdf_path)}")
+            raise ExtractionKilled(
+                f"PDF text extraction took longer than {timeout:.0f} seconds and was stopped. "
+                "The file may be malformed; try re-exporting or printing it to PDF."
+            )
+
+        rss = _rss_bytes(worker.process.pid) if MEMORY_LIMIT_ENFORCED else 0
+        if rss > max_rss:
+            _discard(worker)
+            _count('killed_memory')
+            print(f"Killed PDF extraction at {rss / 1024 / 1024:.0f} MB RSS: {os.path.basename(pdf_path)}")
+            raise ExtractionKilled(_memory_message(max_rss))
+
+
+def _memory_message(max_rss):
+    return (
+        f"PDF text extraction needed more than {max_rss / 1024 / 1024:.0f} MB of memory and was stopped. "
+        "The file may be malformed; try re-exporting or printing it to PDF."
+    )
+
+
+def reset():
+    """Forget workers inherited from a parent process (they belong to the parent)."""
+    global _idle, _started
+
+    _idle = queue.Queue()
+    _started = 0
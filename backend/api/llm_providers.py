@@ -0,0 +1,384 @@
+"""
+LLM providers and hedged requests.
+
+Providers share one interface, `complete(messages, settings, first_token, cancel)`,
+which streams a chat completion and returns (content, usage); `cancel` is a
+Cancel the provider attaches its open stream to:
+- 'openai': the OpenAI API (OPENAI_API_KEY)
+- 'compatible': any OpenAI-compatible server at COMPATIBLE_BASE_URL, e.g. a
+  local vLLM/llama.cpp/Ollama server
+- 'recorded': replays recorded responses from RECORDED_RESPONSES_DIR, for tests
+
+With a backup provider configured, `complete()` hedges: if the primary has
+not streamed its first token by its rolling p95 time-to-first-token for the
+same model (a reasoning model is slower to its first token than nano), the
+same request is sent to the backup and whichever finishes first wins; the
+other stream is closed from the winning side, so a stalled stream stops at
+once instead of at its next chunk. Hedges are capped at HEDGE_MAX_FRACTION of recent
+calls so they can't double spend.
+"""
+
+import os
+import json
+import time
+import hashlib
+import threading
+import contextvars
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+COMPATIBLE_BASE_URL = os.getenv('COMPATIBLE_BASE_URL', 'http://localhost:8000/v1')
+COMPATIBLE_API_KEY = os.getenv('COMPATIBLE_API_KEY', 'not-needed')
+# Model served by the compatible server; replaces the tier's OpenAI model name
+COMPATIBLE_MODEL = os.getenv('COMPATIBLE_MODEL')
+RECORDED_RESPONSES_DIR = os.getenv('RECORDED_RESPONSES_DIR', 'recorded_responses')
+
+HEDGE_MAX_FRACTION = float(os.getenv('HEDGE_MAX_FRACTION', 0.1))
+# First-token samples needed before the p95 is trusted enough to hedge on
+HEDGE_MIN_SAMPLES = int(os.getenv('HEDGE_MIN_SAMPLES', 20))
+LATENCY_WINDOW = 200
+
+# Settings only OpenAI's own models understand
+OPENAI_ONLY_SETTINGS = {'reasoning_effort'}
+
+# Calls made for the current request, for reporting ({'provider', 'hedged'} each)
+current_calls = contextvars.ContextVar('current_calls', default=None)
+
+
+class ProviderNotConfigured(Exception):
+    """Raised when a provider is selected but its credentials/settings are missing."""
+
+
+class StreamCancelled(Exception):
+    """Raised inside a provider call that lost a hedge race, with the usage it ran up so far."""
+
+    def __init__(self, usage=None):
+        super().__init__("stream cancelled")
+        self.usage = usage
+
+
+class Cancel(threading.Event):
+    """Event set to cancel a provider call, closing the stream the call attached so it stops at once."""
+
+    def __init__(self):
+        super().__init__()
+        self._lock = threading.Lock()
+        self._stream = None
+
+    def attach(self, stream):
+        with self._lock:
+            self._stream = stream
+            cancelled = self.is_set()
+        if cancelled:
+            stream.close()
+
+    def set(self):
+        with self._lock:
+            super().set()
+            stream = self._stream
+        if stream is not None:
+            try:
+                stream.close()
+            except Exception as error:
+                print(f"Error closing a cancelled stream: {error}")
+
+
+class OpenAIProvider:
+    """OpenAI API, or an OpenAI-compatible server when base_url is given."""
+
+    def __init__(self, name, api_key, base_url=None, model=None):
+        self.name = name
+        self.api_key = api_key
+        self.base_url = base_url
+        self.model = model
+        self._client = None
+        self._lock = threading.Lock()
+
+    def client(self):
+        """Create the client on first use so importing the app doesn't import openai."""
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    import openai
+                    self._client = openai.OpenAI(api_key=self.api_key, base_url=self.base_url)
+        return self._client
+
+    def reset(self):
+        self._client = None
+
+    def model_name(self, settings):
+        """The model this provider actually serves for a tier's settings."""
+        return self.model or settings.get('model')
+
+    def complete(self, messages, settings, first_token=None, cancel=None):
+        settings = dict(settings)
+        settings['model'] = self.model_name(settings)
+        if self.base_url:
+            for key in OPENAI_ONLY_SETTINGS:
+                settings.pop(key, None)
+
+        stream = self.client().chat.completions.create(
+            messages=messages,
+            stream=True,
+            stream_options={'include_usage': True},
+            **settings
+        )
+
+        parts = []
+        usage = None
+        if cancel is not None:
+            cancel.attach(stream)
+        try:
+            for chunk in stream:
+                if cancel is not None and cancel.is_set():
+                    break
+                if chunk.usage:
+                    usage = chunk.usage
+                if chunk.choices and chunk.choices[0].delta.content:
+                    if first_token is not None and not first_token.is_set():
+                        first_token.set()
+                    parts.append(chunk.choices[0].delta.content)
+        except Exception:
+            # Closing the stream from the winning side ends the read with an error
+            if cancel is None or not cancel.is_set():
+                raise
+        finally:
+            stream.close()
+
+        if cancel is not None and cancel.is_set():
+            # Usage only arrives with the last chunk; the prompt is billed regardless
+            raise StreamCancelled(usage or estimate_usage(messages, "".join(parts)))
+        return "".join(parts), usage
+
+
+class RecordedProvider:
+    """
+    Replays recorded responses instead of calling a model.
+
+    Responses are JSON files named after request_key(messages, model), with
+    'content' and optionally 'usage' and 'latency' (seconds to wait before
+    answering). default.json is used when there is no exact recording.
+    """
+
+    def __init__(self, name, directory):
+        self.name = name
+        self.directory = directory
+
+    def reset(self):
+        pass
+
+    def model_name(self, settings):
+        return settings.get('model')
+
+    def complete(self, messages, settings, first_token=None, cancel=None):
+        path = os.path.join(self.directory, f"{request_key(messages, settings.get('model'))}.json")
+        if not os.path.exists(path):
+            path = os.path.join(self.directory, 'default.json')
+        if not os.path.exists(path):
+            raise Exception(f"No recorded response for this request in {self.directory}")
+
+        with open(path, 'r', encoding='utf-8') as file:
+            recording = json.load(file)
+
+        if cancel is not None and cancel.wait(recording.get('latency', 0)):
+            raise StreamCancelled(estimate_usage(messages, ""))
+        if first_token is not None:
+            first_token.set()
+
+        usage = recording.get('usage') or {}
+        return recording['content'], Usage(**usage)
+
+
+class Usage:
+    """Token usage shaped like the OpenAI response's `usage`, for recorded and estimated calls."""
+
+    def __init__(self, prompt_tokens=0, completion_tokens=0, cached_tokens=0):
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+        self.prompt_tokens_details = type('Details', (), {'cached_tokens': cached_tokens})()
+
+
+def estimate_usage(messages, partial_content):
+    """Rough usage (~4 characters per token) of a call that ended before reporting its own."""
+    prompt_chars = sum(len(message.get('content') or '') for message in messages)
+    return Usage(prompt_tokens=prompt_chars // 4, completion_tokens=len(partial_content) // 4)
+
+
+def request_key(messages, model):
+    """Stable key of a request, used to name recorded responses."""
+    payload = json.dumps({'model': model, 'messages': messages}, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+
+_providers = {}
+_providers_lock = threading.Lock()
+
+
+def get_provider(name):
+    """Return the named provider, creating it on first use."""
+    if name not in _providers:
+        with _providers_lock:
+            if name not in _providers:
+                _providers[name] = _create_provider(name)
+    return _providers[name]
+
+
+def _create_provider(name):
+    if name == 'openai':
+        api_key = os.getenv('OPENAI_API_KEY')
+        if not api_key:
+            raise ProviderNotConfigured("OpenAI API key not configured")
+        return OpenAIProvider('openai', api_key)
+    if name == 'compatible':
+        return OpenAIProvider('compatible', COMPATIBLE_API_KEY, base_url=COMPATIBLE_BASE_URL, model=COMPATIBLE_MODEL)
+    if name == 'recorded':
+        return RecordedProvider('recorded', RECORDED_RESPONSES_DIR)
+    raise ProviderNotConfigured(f"Unknown LLM provider: {name}")
+
+
+def reset():
+    """Drop provider clients, e.g. after fork (HTTP connection pools aren't fork-safe)."""
+    for provider in list(_providers.values()):
+        provider.reset()
+
+
+class LatencyTracker:
+    """Rolling time-to-first-token samples per (provider, model) and the recent hedge rate."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._first_token = {}
+        self._hedged = deque(maxlen=LATENCY_WINDOW)
+
+    def observe(self, provider_name, model, seconds):
+        with self._lock:
+            self._first_token.setdefault((provider_name, model), deque(maxlen=LATENCY_WINDOW)).append(seconds)
+
+    def p95(self, provider_name, model):
+        """p95 time-to-first-token, or None until there are enough samples."""
+        with self._lock:
+            samples = sorted(self._first_token.get((provider_name, model), ()))
+        if len(samples) < HEDGE_MIN_SAMPLES:
+            return None
+        return samples[min(int(len(samples) * 0.95), len(samples) - 1)]
+
+    def record_call(self, hedged):
+        with self._lock:
+            self._hedged.append(hedged)
+
+    def may_hedge(self):
+        """True while hedges stay under HEDGE_MAX_FRACTION of recent calls (counting this one)."""
+        with self._lock:
+            calls = len(self._hedged) + 1
+            return (sum(self._hedged) + 1) / calls <= HEDGE_MAX_FRACTION
+
+    def stats(self):
+        with self._lock:
+            return {
+                'calls': len(self._hedged),
+                'hedged': sum(self._hedged),
+                'first_token_p95': {
+                    f"{name}/{model}": round(sorted(samples)[min(int(len(samples) * 0.95), len(samples) - 1)], 3)
+                    for (name, model), samples in self._first_token.items() if samples
+                }
+            }
+
+
+tracker = LatencyTracker()
+
+
+class FirstToken(threading.Event):
+    """Event set by a provider when its first token arrives, remembering when."""
+
+    def set(self):
+        if not self.is_set():
+            self.time = time.perf_counter()
+        super().set()
+
+
+def _attempt(provider, messages, settings, first_token, cancel, on_usage):
+    """Run one provider call, recording its first-token latency and usage (also when it's cancelled)."""
+    start = time.perf_counter()
+    usage = None
+    try:
+        content, usage = provider.complete(messages, settings, first_token, cancel)
+        return content
+    except StreamCancelled as cancelled:
+        usage = cancelled.usage
+        raise
+    finally:
+        if first_token.is_set():
+            tracker.observe(provider.name, provider.model_name(settings), first_token.time - start)
+        if on_usage and usage is not None:
+            on_usage(provider.name, provider.model_name(settings), usage, time.perf_counter() - start)
+
+
+def complete(messages, settings, primary, backup=None, on_usage=None, allow_hedge=True):
+    """
+    Complete a chat request on the primary provider, hedging to the backup if it's slow.
+
+    on_usage(provider_name, model, usage, latency) is called for every
+    attempt that finishes, including a hedge that loses the race.
+    """
+    primary_provider = get_provider(primary)
+    backup_provider = get_provider(backup) if backup else None
+    calls = current_calls.get()
+
+    primary_first_token, primary_cancel = FirstToken(), Cancel()
+    delay = tracker.p95(primary, primary_provider.model_name(settings)) if backup_provider and allow_hedge else None
+
+    if delay is None:
+        tracker.record_call(False)
+        if calls is not None:
+            calls.append({'provider': primary, 'hedged': False})
+        return _attempt(primary_provider, messages, settings, primary_first_token, primary_cancel, on_usage)
+
+    executor = ThreadPoolExecutor(max_workers=2)
+    try:
+        primary_future = executor.submit(
+            contextvars.copy_context().run,
+            _attempt, primary_provider, messages, settings, primary_first_token, primary_cancel, on_usage
+        )
+
+        deadline = time.perf_counter() + delay
+        while not primary_first_token.is_set() and not primary_future.done():
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            primary_first_token.wait(min(remaining, 0.05))
+
+        if primary_first_token.is_set() or primary_future.done() or not tracker.may_hedge():
+            tracker.record_call(False)
+            if calls is not None:
+                calls.append({'provider': primary, 'hedged': False})
+            return primary_future.result()
+
+        print(f"No first token from {primary} after {delay:.1f}s (p95), hedging to {backup}")
+        tracker.record_call(True)
+        backup_cancel = Cancel()
+        backup_future = executor.submit(
+            contextvars.copy_context().run,
+            _attempt, backup_provider, messages, settings, FirstToken(), backup_cancel, on_usage
+        )
+
+        futures = {primary_future: (primary, backup_cancel), backup_future: (backup, primary_cancel)}
+        pending = set(futures)
+        errors = []
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, loser_cancel = futures[future]
+                try:
+                    content = future.result()
+                except Exception as error:
+                    errors.append(f"{name}: {error}")
+                    continue
+                loser_cancel.set()
+                if calls is not None:
+                    calls.append({'provider': name, 'hedged': True})
+                return content
+
+        raise Exception("; ".join(errors))
+    finally:
+        # Don't wait for the losing attempt; its stream is closed already
+        executor.shutdown(wait=False)
@@ -0,0 +1,149 @@
+"""
+Per-request memory accounting and budgets.
+
+Each pipeline stage of a request runs inside `stage(report, name)`, which
+records the process RSS after the stage and how much the stage changed it.
+The report is logged and returned with the response, and each stage is also
+a tracing span.
+
+MEMORY_TRACKING (off by default, for debugging only) also records each
+stage's peak Python allocation with tracemalloc. Tracing every allocation
+slows requests down several times, and the peak is process-wide, so it
+includes whatever other threads (parallel sections, concurrent requests)
+allocated during the stage.
+
+MEMORY_BUDGET_MB caps what a single request may add to the web worker's
+memory. It is checked from cheap estimates before the expensive stages run:
+- check_pdf_size covers parsing the PDF in the web worker, so it only
+  applies with EXTRACTION_SANDBOX=false (or where the sandbox can't cap
+  memory); sandboxed extraction runs in a separate process capped by
+  EXTRACTION_MAX_RSS_MB instead.
+- estimate_text_memory covers the copies of the paper text held while the
+  prompts are built and sent (strings, messages, JSON request bodies).
+  Oversized text is downgraded (single call instead of parallel, then
+  shortened text) instead of being rejected.
+The constants below were measured as RSS growth with the real OpenAI client
+and pypdfium2/pypdf on text-heavy and figure-heavy PDFs.
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import tracing
+
+MEMORY_TRACKING = os.getenv('MEMORY_TRACKING', 'false').lower() == 'true'
+MEMORY_BUDGET_MB = float(os.getenv('MEMORY_BUDGET_MB', 64))
+
+# Peak memory of in-process PDF parsing: the file itself is held in memory
+# (measured 1.0-1.2x on a 9.7 MB figure-heavy PDF, whose images aren't
+# decoded), plus the text and layout objects of each page (measured 16-21 KB
+# per text-heavy page with pypdfium2 and pypdf)
+EXTRACTION_BYTES_PER_PDF_BYTE = 1.5
+EXTRACTION_BYTES_PER_PAGE = 20 * 1024
+# Copies of the paper text held at once in single mode: text, reduced text,
+# prompt f-string, messages, JSON request body and the encoded HTTP payload
+# (measured 4-6x, more when JSON escapes non-ASCII text)
+TEXT_COPIES_SINGLE = 8
+# Parallel mode holds nine prompts and request bodies at once (measured 34-45x)
+TEXT_COPIES_PARALLEL = 40
+
+MB = 1024 * 1024
+
+if MEMORY_TRACKING and not tracemalloc.is_tracing():
+    tracemalloc.start()
+
+
+class MemoryBudgetExceeded(Exception):
+    """Raised when a request is estimated to need more memory than MEMORY_BUDGET_MB."""
+
+
+def current_rss():
+    """Current resident set size in bytes (peak RSS where /proc isn't available, 0 on Windows)."""
+    try:
+        with open('/proc/self/statm', 'r') as file:
+            return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        pass
+
+    try:
+        import resource
+    except ImportError:
+        # Windows has neither /proc nor resource
+        return 0
+    # ru_maxrss is KB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def new_report():
+    return {'budget_mb': MEMORY_BUDGET_MB, 'stages': {}, 'downgrades': []}
+
+
+@contextmanager
+def stage(report, name):
+    """Track the peak allocation and resulting RSS of one pipeline stage."""
+    with tracing.span(name) as attributes:
+        if MEMORY_TRACKING:
+            tracemalloc.reset_peak()
+            baseline, _ = tracemalloc.get_traced_memory()
+        rss_before = current_rss()
+        start = time.perf_counter()
+
+        try:
+            yield
+        finally:
+            rss_after = current_rss()
+            entry = {
+                'rss_mb': round(rss_after / MB, 1),
+                'rss_delta_mb': round((rss_after - rss_before) / MB, 1),
+                'seconds': round(time.perf_counter() - start, 3)
+            }
+            if MEMORY_TRACKING:
+                _, peak = tracemalloc.get_traced_memory()
+                entry['peak_mb'] = round(max(peak - baseline, 0) / MB, 2)
+            report['stages'][name] = entry
+            attributes.update((key, value) for key, value in entry.items() if key != 'seconds')
+
+
+def log_report(report, label):
+    """Print one line per request with each stage's RSS change (and peak allocation when tracked)."""
+    stages = ", ".join(
+        f"{name} {entry['rss_delta_mb']:+} MB/{entry['rss_mb']} MB rss"
+        + (f"/{entry['peak_mb']} MB peak" if 'peak_mb' in entry else "")
+        for name, entry in report['stages'].items()
+    )
+    print(f"Memory [{label}]: {stages}")
+    if report['downgrades']:
+        print(f"Memory [{label}] downgrades: {'; '.join(report['downgrades'])}")
+
+
+def check_pdf_size(pdf_bytes, pages=None):
+    """
+    Reject a PDF whose in-process extraction alone is estimated to exceed the budget.
+
+    The estimate grows with the file size and the page count (the text to
+    extract), so large figure-heavy papers with few pages still fit.
+    pages=None (page count unknown) estimates from the file size only.
+    """
+    estimate = pdf_bytes * EXTRACTION_BYTES_PER_PDF_BYTE + (pages or 0) * EXTRACTION_BYTES_PER_PAGE
+    if MEMORY_BUDGET_MB and estimate > MEMORY_BUDGET_MB * MB:
+        raise MemoryBudgetExceeded(
+            f"PDF is too large to process within the {MEMORY_BUDGET_MB:.0f} MB memory budget "
+            f"(estimated {estimate / MB:.0f} MB to extract). Try a smaller file."
+        )
+
+
+def estimate_text_memory(text, mode):
+    """Estimated bytes held at once while analyzing `text` in the given mode."""
+    copies = TEXT_COPIES_PARALLEL if mode == 'parallel' else TEXT_COPIES_SINGLE
+    return sys.getsizeof(text) * copies
+
+
+def max_text_chars(text, mode):
+    """Longest prefix length of `text` whose analysis fits the budget."""
+    bytes_per_char = sys.getsizeof(text) / max(len(text), 1)
+    copies = TEXT_COPIES_PARALLEL if mode == 'parallel' else TEXT_COPIES_SINGLE
+    return int(MEMORY_BUDGET_MB * MB / (bytes_per_char * copies))
@@ -0,0 +1,198 @@
+"""
+Related-paper similarity index over previously analyzed papers.
+
+Papers are turned into hashed-feature term-frequency vectors (no vocabulary
+to store or grow) and appended as rows of a float32 matrix on disk, which is
+memory-mapped for queries. TF-IDF weights are derived from the stored rows at
+query time, so appending a paper never rewrites existing rows.
+
+Queries use the memory-map itself as the matrix operand: only the IDF
+weights and one weighted norm per row are kept in memory, so the matrix
+stays in the shared page cache instead of being copied into every worker.
+
+Files in PAPER_INDEX_DIR:
+- vectors.f32: row-major float32 matrix, N_FEATURES columns per paper
+- papers.jsonl: one line per row with the text hash and citation
+"""
+
+import os
+import re
+import json
+import zlib
+import fcntl
+import hashlib
+import threading
+from datetime import datetime
+
+import numpy as np
+
+INDEX_DIR = os.getenv('PAPER_INDEX_DIR', os.path.join('outputs', 'paper_index'))
+
+# 2^14 hashed features keeps each paper at 64 KB on disk
+N_FEATURES = 2 ** 14
+
+TOKEN_PATTERN = re.compile(r'[a-z][a-z0-9\-]{2,}')
+STOPWORDS = {
+    'the', 'and', 'for', 'with', 'that', 'this', 'were', 'was', 'are', 'from', 'have',
+    'has', 'had', 'not', 'but', 'our', 'their', 'these', 'those', 'which', 'than', 'also',
+    'been', 'between', 'into', 'such', 'may', 'can', 'using', 'used', 'each', 'other',
+    'more', 'all', 'both', 'there', 'they', 'its', 'who', 'when', 'while', 'however',
+}
+
+# Rows per block when scanning the matrix, to bound temporary copies (4 MB)
+ROW_CHUNK = 64
+
+_lock = threading.Lock()
+# Per-feature document counts (updated with new rows only) and the IDF
+# weights and weighted row norms derived from them, cached per row count
+_cache = {'rows': 0, 'document_frequency': np.zeros(N_FEATURES, dtype=np.int64), 'idf': None, 'norms': None}
+
+
+def _paths():
+    return (
+        os.path.join(INDEX_DIR, 'vectors.f32'),
+        os.path.join(INDEX_DIR, 'papers.jsonl'),
+        os.path.join(INDEX_DIR, '.lock'),
+    )
+
+
+def text_hash(text):
+    return hashlib.sha256(text.encode('utf-8', errors='ignore')).hexdigest()
+
+
+def vectorize(text):
+    """Sublinear term-frequency vector of a text over hashed features."""
+    tokens = [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+    vector = np.zeros(N_FEATURES, dtype=np.float32)
+    if not tokens:
+        return vector
+
+    # crc32 rather than hash(), which is salted per process
+    indices = np.fromiter((zlib.crc32(token.encode()) % N_FEATURES for token in tokens),
+                          dtype=np.int64, count=len(tokens))
+    counts = np.bincount(indices, minlength=N_FEATURES).astype(np.float32)
+    nonzero = counts > 0
+    vector[nonzero] = 1 + np.log(counts[nonzero])
+    return vector
+
+
+def load_papers():
+    """Metadata for every indexed paper, in row order."""
+    _, papers_path, _ = _paths()
+    if not os.path.exists(papers_path):
+        return []
+    with open(papers_path, 'r', encoding='utf-8') as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+def _load_matrix(papers):
+    """Memory-map the stored vectors, ignoring any row without metadata yet."""
+    vectors_path, _, _ = _paths()
+    if not papers or not os.path.exists(vectors_path):
+        return None
+
+    stored_rows = os.path.getsize(vectors_path) // (N_FEATURES * 4)
+    rows = min(stored_rows, len(papers))
+    if rows == 0:
+        return None
+    return np.memmap(vectors_path, dtype=np.float32, mode='r', shape=(rows, N_FEATURES))
+
+
+def _weights(matrix):
+    """IDF weights and TF-IDF row norms for the matrix (cached until the next append)."""
+    with _lock:
+        rows = matrix.shape[0]
+        if _cache['idf'] is not None and _cache['rows'] == rows:
+            return _cache['idf'], _cache['norms']
+
+        # Rows are only ever appended, so only new rows add to the document counts
+        if _cache['rows'] > rows:
+            _cache.update(rows=0, document_frequency=np.zeros(N_FEATURES, dtype=np.int64))
+        document_frequency = _cache['document_frequency'].copy()
+        for start in range(_cache['rows'], rows, ROW_CHUNK):
+            document_frequency += np.count_nonzero(matrix[start:start + ROW_CHUNK], axis=0)
+
+        idf = (np.log((1 + rows) / (1 + document_frequency)) + 1).astype(np.float32)
+        # |row * idf| for every row; the IDF changes with each append, so all norms are recomputed
+        idf_squared = idf * idf
+        norms = np.empty(rows, dtype=np.float32)
+        for start in range(0, rows, ROW_CHUNK):
+            block = matrix[start:start + ROW_CHUNK]
+            norms[start:start + len(block)] = np.sqrt((block * block) @ idf_squared)
+
+        _cache.update(rows=rows, document_frequency=document_frequency, idf=idf, norms=norms)
+        return idf, norms
+
+
+def query(texts, k=5, min_similarity=0.0, exclude_hashes=None):
+    """
+    Find the k most similar indexed papers for each text in one batched product.
+
+    Returns one list per text of dicts with citation, similarity and hash.
+    Papers whose text hash is in exclude_hashes (e.g. the paper itself) are skipped.
+    """
+    papers = load_papers()
+    matrix = _load_matrix(papers)
+    if matrix is None:
+        return [[] for _ in texts]
+
+    idf, norms = _weights(matrix)
+
+    queries = np.stack([vectorize(text) for text in texts]) * idf
+    queries /= np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+    # cos(q, row * idf) = ((q * idf) . row) / |row * idf|, without weighting a copy of the matrix
+    scores = (queries * idf) @ matrix.T
+    scores /= np.maximum(norms, 1e-12)
+
+    exclude_hashes = exclude_hashes or set()
+    candidates = min(k + len(exclude_hashes), scores.shape[1])
+    results = []
+    for row in scores:
+        top = np.argpartition(-row, candidates - 1)[:candidates]
+        top = top[np.argsort(-row[top])]
+        matches = []
+        for index in top:
+            paper = papers[index]
+            if paper['hash'] in exclude_hashes or row[index] < min_similarity:
+                continue
+            matches.append({
+                'citation': paper['citation'],
+                'similarity': round(float(row[index]), 3),
+                'hash': paper['hash']
+            })
+            if len(matches) == k:
+                break
+        results.append(matches)
+
+    return results
+
+
+def add_paper(text, citation):
+    """Append a paper to the index unless the same text is already in it. Returns True if added."""
+    vectors_path, papers_path, lock_path = _paths()
+    os.makedirs(INDEX_DIR, exist_ok=True)
+    paper_hash = text_hash(text)
+    vector = vectorize(text)
+
+    # File lock so gunicorn workers appending at the same time don't interleave rows
+    with open(lock_path, 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            papers = load_papers()
+            if any(paper['hash'] == paper_hash for paper in papers):
+                return False
+
+            with open(vectors_path, 'ab') as file:
+                # Drop a row left behind by an append that died before writing its metadata
+                file.truncate(len(papers) * N_FEATURES * 4)
+                file.write(vector.tobytes())
+            with open(papers_path, 'a', encoding='utf-8') as file:
+                file.write(json.dumps({
+                    'hash': paper_hash,
+                    'citation': citation,
+                    'added': datetime.now().isoformat(timespec='seconds')
+                }) + "\n")
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    return True
@@ -0,0 +1,196 @@
+"""
+PDF text-extraction backends.
+
+Each backend is a function that takes a PDF path and returns a list of page
+texts. Backends are imported lazily so a missing optional library only
+disables that backend instead of breaking the app.
+
+Select a backend with the PDF_EXTRACTOR environment variable (or per request),
+or use 'auto' to try the fastest installed backend first and fall back to the
+next one when the extracted text looks poor (empty pages, garbled encoding).
+"""
+
+import os
+import re
+import importlib.util
+
+
+# Fastest first, as measured by benchmark_extractors.py (pypdf 6 is slower
+# than PyPDF2 3 for the same text) - this is the order 'auto' tries them in
+BACKEND_ORDER = ['pypdfium2', 'PyPDF2', 'pypdf', 'pdfminer']
+
+# Module that has to be importable for each backend to be usable
+BACKEND_MODULES = {
+    'pypdfium2': 'pypdfium2',
+    'pypdf': 'pypdf',
+    'PyPDF2': 'PyPDF2',
+    'pdfminer': 'pdfminer',
+}
+
+DEFAULT_BACKEND = os.getenv('PDF_EXTRACTOR', 'auto')
+
+# Quality thresholds used by 'auto' before accepting a backend's output
+MIN_QUALITY_SCORE = float(os.getenv('PDF_EXTRACTOR_MIN_QUALITY', 0.6))
+MIN_CHARS_PER_PAGE = 20
+
+CID_PATTERN = re.compile(r'\(cid:\d+\)')
+
+
+def _extract_pypdfium2(pdf_path):
+    import pypdfium2
+
+    pdf = pypdfium2.PdfDocument(pdf_path)
+    try:
+        pages = []
+        for page in pdf:
+            text_page = page.get_textpage()
+            pages.append(text_page.get_text_range().replace('\r\n', '\n'))
+            text_page.close()
+            page.close()
+        return pages
+    finally:
+        pdf.close()
+
+
+def _extract_pypdf(pdf_path):
+    import pypdf
+
+    with open(pdf_path, 'rb') as file:
+        reader = pypdf.PdfReader(file)
+        return [page.extract_text() or "" for page in reader.pages]
+
+
+def _extract_pypdf2(pdf_path):
+    import PyPDF2
+
+    with open(pdf_path, 'rb') as file:
+        reader = PyPDF2.PdfReader(file)
+        return [page.extract_text() or "" for page in reader.pages]
+
+
+def _extract_pdfminer(pdf_path):
+    from pdfminer.high_level import extract_text
+
+    # pdfminer separates pages with form feeds
+    text = extract_text(pdf_path)
+    pages = text.split('\f')
+    if pages and not pages[-1].strip():
+        pages = pages[:-1]
+    return pages
+
+
+def page_count(pdf_path):
+    """
+    Number of pages, read from the page tree without extracting anything.
+
+    Uses the first installed of pypdfium2, pypdf and PyPDF2 (pypdfium2 takes
+    under a millisecond even for 2,000 pages). Returns None if none of them
+    is installed or the file can't be opened.
+    """
+    for backend in ['pypdfium2', 'pypdf', 'PyPDF2']:
+        if backend not in available_backends():
+            continue
+        try:
+            if backend == 'pypdfium2':
+                import pypdfium2
+                pdf = pypdfium2.PdfDocument(pdf_path)
+                try:
+                    return len(pdf)
+                finally:
+                    pdf.close()
+            module = __import__(backend)
+            with open(pdf_path, 'rb') as file:
+                return len(module.PdfReader(file).pages)
+        except Exception:
+            return None
+    return None
+
+
+EXTRACTORS = {
+    'pypdfium2': _extract_pypdfium2,
+    'pypdf': _extract_pypdf,
+    'PyPDF2': _extract_pypdf2,
+    'pdfminer': _extract_pdfminer,
+}
+
+
+def available_backends():
+    """Return installed backends in 'auto' order."""
+    return [
+        name for name in BACKEND_ORDER
+        if importlib.util.find_spec(BACKEND_MODULES[name]) is not None
+    ]
+
+
+def text_quality(pages):
+    """
+    Score extracted text between 0 and 1.
+
+    Penalizes empty pages and garbled output: unicode replacement characters,
+    unmapped '(cid:N)' glyphs, control characters and text that is mostly
+    non-alphanumeric.
+    """
+    if not pages:
+        return 0.0
+
+    non_empty = [page for page in pages if len(page.strip()) >= MIN_CHARS_PER_PAGE]
+    page_score = len(non_empty) / len(pages)
+
+    text = "".join(non_empty)
+    if not text:
+        return 0.0
+
+    garbled = text.count('�') + sum(len(m) for m in CID_PATTERN.findall(text))
+    garbled += sum(1 for char in text if ord(char) < 32 and char not in '\n\r\t\f')
+    visible = [char for char in text if not char.isspace()]
+    if not visible:
+        return 0.0
+
+    alnum_ratio = sum(1 for char in visible if char.isalnum()) / len(visible)
+    clean_ratio = max(0.0, 1 - garbled / len(text))
+    # Normal prose is ~80-90% alphanumeric; only penalize well below that
+    alnum_score = min(1.0, alnum_ratio / 0.7)
+
+    return page_score * clean_ratio * alnum_score
+
+
+def extract_pages(pdf_path, backend=None):
+    """
+    Extract page texts with the given backend (or DEFAULT_BACKEND).
+
+    Returns a tuple of (pages, backend_name, quality_score).
+    """
+    backend = backend or DEFAULT_BACKEND
+
+    if backend != 'auto':
+        if backend not in EXTRACTORS:
+            raise ValueError(f"Unknown PDF extractor '{backend}'. Choose from: auto, {', '.join(BACKEND_ORDER)}")
+        if backend not in available_backends():
+            raise ValueError(f"PDF extractor '{backend}' is not installed")
+        pages = EXTRACTORS[backend](pdf_path)
+        return pages, backend, text_quality(pages)
+
+    best = None
+    errors = []
+    for name in available_backends():
+        try:
+            pages = EXTRACTORS[name](pdf_path)
+        except MemoryError:
+            # Another backend won't fit either; let the caller's memory limit handling see it
+            raise
+        except Exception as error:
+            errors.append(f"{name}: {error}")
+            continue
+
+        score = text_quality(pages)
+        if score >= MIN_QUALITY_SCORE:
+            return pages, name, score
+
+        print(f"PDF extractor {name} produced low-quality text (score {score:.2f}), trying next backend")
+        if best is None or score > best[2]:
+            best = (pages, name, score)
+
+    if best is None:
+        raise Exception("; ".join(errors) or "No PDF extraction backend is installed")
+
+    return best
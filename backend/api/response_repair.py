@@ -0,0 +1,153 @@
+"""
+Local repair of truncated or malformed JSON in model responses.
+
+Handles the two ways the analysis JSON usually breaks:
+- truncated: the response stops mid-object (token limit, dropped stream), so
+  open strings, arrays and objects are closed at the last complete value
+- malformed: the object is complete but invalid, most often because of
+  trailing commas or raw control characters inside strings
+"""
+
+import json
+import re
+
+MAX_CUT_ATTEMPTS = 50
+
+TRAILING_COMMA_PATTERN = re.compile(r',\s*([}\]])')
+KEY_SEPARATOR_PATTERN = re.compile(r'\s*:')
+CLOSERS = {'{': '}', '[': ']'}
+
+
+def extract_json_candidate(response_text):
+    """Return the text from the first '{' up to a closing code fence (or the end)."""
+    start = response_text.find('{')
+    if start == -1:
+        return None
+
+    end = response_text.find('```', start)
+    return response_text[start:end if end != -1 else len(response_text)].rstrip()
+
+
+def _loads(candidate):
+    """json.loads that also tolerates trailing commas and raw control characters."""
+    try:
+        return json.loads(candidate, strict=False)
+    except json.JSONDecodeError:
+        pass
+
+    try:
+        return json.loads(TRAILING_COMMA_PATTERN.sub(r'\1', candidate), strict=False)
+    except json.JSONDecodeError:
+        return None
+
+
+def _scan(candidate):
+    """
+    Walk the candidate tracking string state and open brackets.
+
+    Returns (end, stack, in_string, cut_points): end is the index just after
+    the balanced top-level object (None if it never closes), and cut_points
+    lists (index, stack) for every structural comma, where the text can be
+    cut and closed to get the object up to its last complete value.
+    """
+    stack = []
+    cut_points = []
+    in_string = False
+    escape_next = False
+
+    for i, char in enumerate(candidate):
+        if escape_next:
+            escape_next = False
+            continue
+        if char == '\\':
+            escape_next = True
+            continue
+        if char == '"':
+            in_string = not in_string
+            continue
+        if in_string:
+            continue
+
+        if char in CLOSERS:
+            stack.append(char)
+        elif char in '}]':
+            if stack:
+                stack.pop()
+            if not stack:
+                return i + 1, stack, False, cut_points
+        elif char == ',':
+            cut_points.append((i, list(stack)))
+
+    return None, stack, in_string, cut_points
+
+
+def top_level_keys(candidate):
+    """Keys of the top-level object in a JSON candidate, in order, even if it doesn't parse."""
+    keys = []
+    depth = 0
+    in_string = False
+    escape_next = False
+    start = None
+
+    for i, char in enumerate(candidate):
+        if in_string:
+            if escape_next:
+                escape_next = False
+            elif char == '\\':
+                escape_next = True
+            elif char == '"':
+                in_string = False
+                if depth == 1 and KEY_SEPARATOR_PATTERN.match(candidate, i + 1):
+                    try:
+                        keys.append(json.loads(candidate[start:i + 1], strict=False))
+                    except json.JSONDecodeError:
+                        keys.append(candidate[start + 1:i])
+            continue
+
+        if char == '"':
+            in_string = True
+            start = i
+        elif char in CLOSERS:
+            depth += 1
+        elif char in '}]':
+            depth -= 1
+
+    return keys
+
+
+def _close(text, stack):
+    return text + "".join(CLOSERS[char] for char in reversed(stack))
+
+
+def repair_json(response_text):
+    """
+    Try to recover a JSON object from a broken response without another API call.
+
+    Returns (data, truncated): data is the repaired object or None, truncated
+    is True when the response stopped before the object was closed. A
+    truncated object's last key may hold a partial value.
+    """
+    candidate = extract_json_candidate(response_text)
+    if candidate is None:
+        return None, False
+
+    end, stack, in_string, cut_points = _scan(candidate)
+
+    if end is not None:
+        data = _loads(candidate[:end])
+        return (data if isinstance(data, dict) else None), False
+
+    # Truncated: first close the dangling value as-is...
+    tail = candidate + '"' if in_string else candidate
+    tail = re.sub(r'[,:\s]+$', '', tail)
+    data = _loads(_close(tail, stack))
+    if isinstance(data, dict):
+        return data, True
+
+    # ...then cut back to earlier complete values until the rest parses
+    for index, cut_stack in reversed(cut_points[-MAX_CUT_ATTEMPTS:]):
+        data = _loads(_close(candidate[:index], cut_stack))
+        if isinstance(data, dict):
+            return data, True
+
+    return None, True
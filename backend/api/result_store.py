@@ -0,0 +1,127 @@
+"""
+Stored analysis results, so single sections can be regenerated later.
+
+Each result keeps the extracted paper text, the parsed analysis and a little
+metadata (related papers, filename) in RESULTS_DIR/<result_id>/. Results
+older than RESULT_TTL_HOURS are removed when new ones are saved.
+
+Complete results can also be indexed by a hash of their text, a hash of the
+settings that produced them (prompt, models, providers), the analysis mode
+and the budget mode in RESULTS_DIR/by_hash/ (see remember()), so the same
+paper submitted again within the TTL is served from the store instead of
+being analyzed again, until any of those change.
+"""
+
+import os
+import re
+import json
+import time
+import uuid
+import shutil
+import hashlib
+
+RESULTS_DIR = os.getenv('RESULTS_DIR', os.path.join('outputs', 'results'))
+RESULT_TTL_HOURS = float(os.getenv('RESULT_TTL_HOURS', 24))
+
+RESULT_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+HASH_DIR = os.path.join(RESULTS_DIR, 'by_hash')
+
+
+class ResultNotFound(Exception):
+    """Raised for unknown, expired or malformed result ids."""
+
+
+def _result_path(result_id):
+    # Ids are used as directory names, so only accept our own format
+    if not isinstance(result_id, str) or not RESULT_ID_PATTERN.match(result_id):
+        raise ResultNotFound("Invalid result id")
+    return os.path.join(RESULTS_DIR, result_id)
+
+
+def text_hash(text_content):
+    return hashlib.sha256(text_content.encode('utf-8', errors='ignore')).hexdigest()
+
+
+def _hash_path(content_hash, settings_hash, mode, budget_mode):
+    return os.path.join(HASH_DIR, f"{content_hash}_{settings_hash}_{mode}_{budget_mode}")
+
+
+def cleanup_expired():
+    """Remove results (and hash index entries) older than RESULT_TTL_HOURS."""
+    if not os.path.isdir(RESULTS_DIR):
+        return
+    cutoff = time.time() - RESULT_TTL_HOURS * 3600
+    for name in os.listdir(RESULTS_DIR):
+        path = os.path.join(RESULTS_DIR, name)
+        if RESULT_ID_PATTERN.match(name) and os.path.getmtime(path) < cutoff:
+            shutil.rmtree(path, ignore_errors=True)
+    if os.path.isdir(HASH_DIR):
+        for name in os.listdir(HASH_DIR):
+            path = os.path.join(HASH_DIR, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError:
+                pass
+
+
+def save(text_content, analysis, meta):
+    """Store a result and return its id."""
+    cleanup_expired()
+
+    result_id = uuid.uuid4().hex
+    path = _result_path(result_id)
+    os.makedirs(path)
+
+    with open(os.path.join(path, 'text.txt'), 'w', encoding='utf-8') as file:
+        file.write(text_content)
+    save_analysis(result_id, analysis)
+    with open(os.path.join(path, 'meta.json'), 'w', encoding='utf-8') as file:
+        json.dump(meta, file)
+
+    return result_id
+
+
+def remember(result_id, content_hash, settings_hash, mode, budget_mode):
+    """Serve this result to later requests for the same text, settings, mode and budget mode."""
+    os.makedirs(HASH_DIR, exist_ok=True)
+    with open(_hash_path(content_hash, settings_hash, mode, budget_mode), 'w', encoding='utf-8') as file:
+        file.write(result_id)
+
+
+def find(content_hash, settings_hash, mode, budget_mode):
+    """Return the id of a remembered result for this text hash, settings hash, mode and budget mode, or None."""
+    try:
+        with open(_hash_path(content_hash, settings_hash, mode, budget_mode), 'r', encoding='utf-8') as file:
+            result_id = file.read().strip()
+        path = _result_path(result_id)
+        if os.path.getmtime(path) >= time.time() - RESULT_TTL_HOURS * 3600:
+            return result_id
+    except (OSError, ResultNotFound):
+        pass
+    return None
+
+
+def save_analysis(result_id, analysis):
+    """Replace a stored result's analysis (atomically, so readers never see half a file)."""
+    path = _result_path(result_id)
+    temp_path = os.path.join(path, 'analysis.json.tmp')
+    with open(temp_path, 'w', encoding='utf-8') as file:
+        json.dump(analysis, file, ensure_ascii=False)
+    os.replace(temp_path, os.path.join(path, 'analysis.json'))
+
+
+def load(result_id):
+    """Return (text_content, analysis, meta) for a stored result."""
+    path = _result_path(result_id)
+    if not os.path.isdir(path):
+        raise ResultNotFound("Result not found or expired. Please analyze the paper again.")
+
+    with open(os.path.join(path, 'text.txt'), 'r', encoding='utf-8') as file:
+        text_content = file.read()
+    with open(os.path.join(path, 'analysis.json'), 'r', encoding='utf-8') as file:
+        analysis = json.load(file)
+    with open(os.path.join(path, 'meta.json'), 'r', encoding='utf-8') as file:
+        meta = json.load(file)
+
+    return text_content, analysis, meta
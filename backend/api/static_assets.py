@@ -0,0 +1,95 @@
+"""
+Serving of pre-built frontend assets and compression of API responses.
+
+When build_assets.py has produced frontend/build/, fingerprinted files are
+served with long-lived immutable cache headers, using the pre-compressed
+.br/.gz variant the client accepts. Dynamic responses (the analysis JSON,
+index.html) are compressed on the fly.
+"""
+
+import gzip
+import json
+import mimetypes
+import os
+
+from flask import send_from_directory
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Responses smaller than this aren't worth compressing
+MIN_COMPRESS_SIZE = 1024
+COMPRESSIBLE_MIMETYPES = {'application/json', 'text/html', 'text/markdown', 'text/plain'}
+
+IMMUTABLE_CACHE = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE = 'no-cache'
+
+
+def load_manifest(build_path):
+    """Return the original -> fingerprinted filename map, or None if there's no build."""
+    manifest_path = os.path.join(build_path, 'manifest.json')
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path, 'r', encoding='utf-8') as file:
+        return json.load(file)
+
+
+def accepted_encodings(accept_encoding):
+    """Parse an Accept-Encoding header into the set of encodings with q > 0."""
+    encodings = set()
+    for part in (accept_encoding or '').split(','):
+        name, _, params = part.strip().partition(';')
+        if params.strip().replace(' ', '') in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            continue
+        if name:
+            encodings.add(name.strip().lower())
+    return encodings
+
+
+def send_asset(build_path, filename, manifest, accept_encoding):
+    """Send a built asset, preferring a pre-compressed variant the client accepts."""
+    encodings = accepted_encodings(accept_encoding)
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+    response = None
+    for encoding, suffix in (('br', '.br'), ('gzip', '.gz')):
+        if encoding in encodings and os.path.isfile(os.path.join(build_path, filename + suffix)):
+            response = send_from_directory(build_path, filename + suffix, mimetype=mimetype)
+            response.headers['Content-Encoding'] = encoding
+            break
+
+    if response is None:
+        response = send_from_directory(build_path, filename, mimetype=mimetype)
+
+    response.vary.add('Accept-Encoding')
+    if filename in manifest.values():
+        response.headers['Cache-Control'] = IMMUTABLE_CACHE
+    return response
+
+
+def compress_response(response, accept_encoding):
+    """Compress a dynamic response body in place if the client accepts it."""
+    if (response.direct_passthrough or response.status_code != 200
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+
+    data = response.get_data()
+    if len(data) < MIN_COMPRESS_SIZE:
+        return response
+
+    encodings = accepted_encodings(accept_encoding)
+    if brotli is not None and 'br' in encodings:
+        # Low quality keeps per-request CPU small; most of the gain is in the first levels
+        response.set_data(brotli.compress(data, quality=4))
+        response.headers['Content-Encoding'] = 'br'
+    elif 'gzip' in encodings:
+        response.set_data(gzip.compress(data, compresslevel=6))
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        return response
+
+    response.vary.add('Accept-Encoding')
+    return response
@@ -0,0 +1,213 @@
+"""
+Lightweight per-request span tracing.
+
+Every request gets a trace id (returned in the X-Trace-Id header and in JSON
+bodies). Pipeline stages run inside `span(name)`, which records when the
+stage started, how long it took, its attributes and, if it raised, the
+error, so a slow or failed request can be explained stage by stage.
+
+Completed traces that recorded spans (or failed) are appended as one JSON
+line each to TRACES_FILE, rotated to TRACES_FILE.1 past TRACES_MAX_MB.
+`slowest()` reads the recent traces back for the /api/traces endpoint; no
+external collector is needed. Traces hold error messages and timings but
+not filenames.
+"""
+
+import os
+import json
+import time
+import uuid
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+TRACING = os.getenv('TRACING', 'true').lower() == 'true'
+TRACES_FILE = os.getenv('TRACES_FILE', os.path.join('outputs', 'traces.jsonl'))
+TRACES_MAX_MB = float(os.getenv('TRACES_MAX_MB', 10))
+# Most recent traces considered by slowest()
+TRACE_QUERY_WINDOW = int(os.getenv('TRACE_QUERY_WINDOW', 1000))
+# Required (X-Traces-Token header) to read /api/traces from other hosts
+TRACES_TOKEN = os.getenv('TRACES_TOKEN', '')
+
+current_trace = contextvars.ContextVar('current_trace', default=None)
+_current_span = contextvars.ContextVar('current_span', default=None)
+
+_write_lock = threading.Lock()
+
+
+class Trace:
+    def __init__(self, name):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.name = name
+        self.started_at = datetime.now(timezone.utc)
+        self.start = time.perf_counter()
+        self.spans = []
+        self.attributes = {}
+        self._lock = threading.Lock()
+        self._next_span = 0
+
+    def new_span(self, name, parent, attributes):
+        with self._lock:
+            self._next_span += 1
+            entry = {
+                'id': self._next_span,
+                'parent': parent,
+                'name': name,
+                'start_ms': round((time.perf_counter() - self.start) * 1000, 1),
+                'duration_ms': None,
+                'status': 'ok',
+                'attributes': attributes
+            }
+            self.spans.append(entry)
+        return entry
+
+    def failed_span(self):
+        """The innermost span that raised, i.e. the stage where the request failed."""
+        failed = [entry for entry in self.spans if entry['status'] == 'error']
+        return max(failed, key=lambda entry: entry['id']) if failed else None
+
+
+def start_trace(name):
+    trace = Trace(name)
+    current_trace.set(trace)
+    _current_span.set(None)
+    return trace
+
+
+def annotate(**attributes):
+    """Add request-level attributes (filename, mode, ...) to the current trace."""
+    trace = current_trace.get()
+    if trace is not None:
+        trace.attributes.update(attributes)
+
+
+@contextmanager
+def span(name, **attributes):
+    """
+    Record one stage of the current trace.
+
+    Yields the span's attribute dict, so callers can add results
+    (sizes, models) while the stage runs. A no-op without a trace.
+    """
+    trace = current_trace.get()
+    if trace is None or not TRACING:
+        yield attributes
+        return
+
+    entry = trace.new_span(name, _current_span.get(), attributes)
+    token = _current_span.set(entry['id'])
+    start = time.perf_counter()
+    try:
+        yield attributes
+    except BaseException as error:
+        entry['status'] = 'error'
+        entry['error'] = f"{type(error).__name__}: {error}"
+        raise
+    finally:
+        entry['duration_ms'] = round((time.perf_counter() - start) * 1000, 1)
+        _current_span.reset(token)
+
+
+def stage_durations(record):
+    """Total milliseconds per span name of a finished trace record."""
+    durations = {}
+    for entry in record['spans']:
+        durations[entry['name']] = round(durations.get(entry['name'], 0) + (entry['duration_ms'] or 0), 1)
+    return durations
+
+
+def finish_trace(trace, status_code, **attributes):
+    """Close the trace and append it to TRACES_FILE if it recorded anything worth keeping."""
+    current_trace.set(None)
+    if not TRACING or (not trace.spans and status_code < 500):
+        return None
+
+    failed = trace.failed_span()
+    record = {
+        'trace_id': trace.trace_id,
+        'name': trace.name,
+        'timestamp': trace.started_at.isoformat(timespec='seconds'),
+        'duration_ms': round((time.perf_counter() - trace.start) * 1000, 1),
+        'status_code': status_code,
+        'failed_stage': failed['name'] if failed else None,
+        'error': failed.get('error') if failed else None,
+        'attributes': dict(trace.attributes, **attributes),
+        'spans': trace.spans
+    }
+
+    try:
+        _append(json.dumps(record, default=str) + "\n")
+    except OSError as error:
+        print(f"Failed to write trace {trace.trace_id}: {error}")
+    return record
+
+
+def _append(line):
+    with _write_lock:
+        directory = os.path.dirname(TRACES_FILE)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        try:
+            if os.path.getsize(TRACES_FILE) > TRACES_MAX_MB * 1024 * 1024:
+                os.replace(TRACES_FILE, TRACES_FILE + '.1')
+        except FileNotFoundError:
+            pass
+        # One append-mode write per trace, so lines from several workers don't interleave
+        with open(TRACES_FILE, 'a', encoding='utf-8') as file:
+            file.write(line)
+
+
+def recent(window=None):
+    """The last `window` finished trace records, oldest first."""
+    lines = deque(maxlen=window or TRACE_QUERY_WINDOW)
+    for path in (TRACES_FILE + '.1', TRACES_FILE):
+        try:
+            with open(path, 'r', encoding='utf-8') as file:
+                lines.extend(file)
+        except FileNotFoundError:
+            continue
+
+    records = []
+    for line in lines:
+        try:
+            records.append(json.loads(line))
+        except ValueError:
+            continue
+    return records
+
+
+def slowest(stage=None, limit=10, window=None):
+    """
+    Slowest recent traces, by the total time of one stage or of the whole request.
+
+    Each entry summarizes a trace with its per-stage durations; fetch the
+    full record (every span) with find(trace_id).
+    """
+    summaries = []
+    for record in recent(window):
+        durations = stage_durations(record)
+        if stage and stage not in durations:
+            continue
+        summaries.append({
+            'trace_id': record['trace_id'],
+            'name': record['name'],
+            'timestamp': record['timestamp'],
+            'status_code': record['status_code'],
+            'duration_ms': durations[stage] if stage else record['duration_ms'],
+            'total_ms': record['duration_ms'],
+            'failed_stage': record.get('failed_stage'),
+            'stages': durations
+        })
+
+    summaries.sort(key=lambda summary: summary['duration_ms'], reverse=True)
+    return summaries[:limit]
+
+
+def find(trace_id, window=None):
+    """The full record of a recent trace, or None."""
+    for record in reversed(recent(window)):
+        if record['trace_id'] == trace_id:
+            return record
+    return None
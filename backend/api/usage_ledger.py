@@ -0,0 +1,175 @@
+"""
+Token usage ledger and daily budget tracking.
+
+Every LLM call is recorded in a local SQLite database with the provider and
+model that served it, its prompt, cached and completion tokens, latency and
+estimated cost, tagged with the client that made the request.
+
+Only OpenAI calls are priced from MODEL_PRICES. Other providers (a local
+compatible server, recorded responses) are priced per token from
+PROVIDER_PRICES_PER_1M, which is 0 unless configured. `python main.py usage`
+shows the totals per day, client and provider.
+
+The daily spend is compared against DAILY_BUDGET_USD to decide how a new
+request should run: normally, on cheaper models, or on cheaper models with
+reduced paper text.
+"""
+
+import os
+import sqlite3
+import threading
+import contextvars
+from datetime import datetime, timedelta
+
+LEDGER_PATH = os.getenv('USAGE_LEDGER_PATH', os.path.join('outputs', 'usage_ledger.db'))
+
+# 0 disables budget-driven routing
+DAILY_BUDGET_USD = float(os.getenv('DAILY_BUDGET_USD', 0))
+# Fractions of the daily budget at which requests are downgraded
+CHEAPER_MODEL_AT = float(os.getenv('BUDGET_CHEAPER_MODEL_AT', 0.8))
+REDUCED_TEXT_AT = float(os.getenv('BUDGET_REDUCED_TEXT_AT', 0.95))
+
+BUDGET_MODES = ['normal', 'cheaper_model', 'reduced_text']
+
+# USD per 1M tokens: (input, cached input, output)
+MODEL_PRICES = {
+    'gpt-5': (1.25, 0.125, 10.00),
+    'gpt-5-mini': (0.25, 0.025, 2.00),
+    'gpt-5-nano': (0.05, 0.005, 0.40),
+}
+
+# USD per 1M tokens (input or output) for providers other than OpenAI
+PROVIDER_PRICES_PER_1M = {
+    'compatible': float(os.getenv('COMPATIBLE_PRICE_PER_1M', 0)),
+}
+
+# Client and budget mode of the request being served; copied into worker
+# threads with contextvars.copy_context()
+current_client = contextvars.ContextVar('current_client', default='unknown')
+current_budget_mode = contextvars.ContextVar('current_budget_mode', default='normal')
+
+_init_lock = threading.Lock()
+_initialized = False
+
+
+def _connect():
+    global _initialized
+
+    connection = sqlite3.connect(LEDGER_PATH, timeout=10)
+    if not _initialized:
+        with _init_lock:
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS usage (
+                    timestamp TEXT NOT NULL,
+                    day TEXT NOT NULL,
+                    client_id TEXT NOT NULL,
+                    provider TEXT NOT NULL DEFAULT 'openai',
+                    model TEXT NOT NULL,
+                    purpose TEXT NOT NULL,
+                    prompt_tokens INTEGER NOT NULL,
+                    cached_tokens INTEGER NOT NULL,
+                    completion_tokens INTEGER NOT NULL,
+                    latency_ms REAL NOT NULL,
+                    cost_usd REAL NOT NULL
+                )
+            """)
+            # Ledgers created before calls were tagged with their provider
+            columns = [row[1] for row in connection.execute("PRAGMA table_info(usage)")]
+            if 'provider' not in columns:
+                connection.execute("ALTER TABLE usage ADD COLUMN provider TEXT NOT NULL DEFAULT 'openai'")
+            connection.execute("CREATE INDEX IF NOT EXISTS usage_day ON usage (day, client_id)")
+            connection.commit()
+            _initialized = True
+    return connection
+
+
+def estimate_cost(provider, model, prompt_tokens, cached_tokens, completion_tokens):
+    """Estimated USD cost of one call; unknown OpenAI models are priced as gpt-5."""
+    if provider != 'openai':
+        return (prompt_tokens + completion_tokens) * PROVIDER_PRICES_PER_1M.get(provider, 0.0) / 1_000_000
+
+    input_price, cached_price, output_price = MODEL_PRICES.get(model, MODEL_PRICES['gpt-5'])
+    uncached = max(prompt_tokens - cached_tokens, 0)
+    return (uncached * input_price + cached_tokens * cached_price + completion_tokens * output_price) / 1_000_000
+
+
+def record(provider, model, purpose, usage, latency):
+    """Record one API call. `usage` is the response.usage object (may be None)."""
+    prompt_tokens = getattr(usage, 'prompt_tokens', 0) or 0
+    completion_tokens = getattr(usage, 'completion_tokens', 0) or 0
+    details = getattr(usage, 'prompt_tokens_details', None)
+    cached_tokens = getattr(details, 'cached_tokens', 0) or 0
+
+    now = datetime.now()
+    try:
+        with _connect() as connection:
+            connection.execute(
+                """
+                INSERT INTO usage (timestamp, day, client_id, provider, model, purpose, prompt_tokens,
+                                   cached_tokens, completion_tokens, latency_ms, cost_usd)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    now.isoformat(timespec='seconds'), now.strftime('%Y-%m-%d'),
+                    current_client.get(), provider, model, purpose,
+                    prompt_tokens, cached_tokens, completion_tokens,
+                    round(latency * 1000, 1),
+                    estimate_cost(provider, model, prompt_tokens, cached_tokens, completion_tokens)
+                )
+            )
+    except sqlite3.Error as error:
+        # Never fail an analysis because the ledger couldn't be written
+        print(f"Usage ledger error: {error}")
+
+
+def spent_today():
+    """Estimated USD spent so far today across all clients."""
+    try:
+        with _connect() as connection:
+            row = connection.execute(
+                "SELECT COALESCE(SUM(cost_usd), 0) FROM usage WHERE day = ?",
+                (datetime.now().strftime('%Y-%m-%d'),)
+            ).fetchone()
+        return row[0]
+    except sqlite3.Error as error:
+        print(f"Usage ledger error: {error}")
+        return 0.0
+
+
+def budget_status():
+    """Return the budget mode new requests should run in, with today's spend."""
+    spent = spent_today() if DAILY_BUDGET_USD > 0 else 0.0
+
+    mode = 'normal'
+    if DAILY_BUDGET_USD > 0:
+        if spent >= DAILY_BUDGET_USD * REDUCED_TEXT_AT:
+            mode = 'reduced_text'
+        elif spent >= DAILY_BUDGET_USD * CHEAPER_MODEL_AT:
+            mode = 'cheaper_model'
+
+    return {
+        'mode': mode,
+        'spent_today_usd': round(spent, 4),
+        'daily_budget_usd': DAILY_BUDGET_USD or None
+    }
+
+
+def rollup(days=7):
+    """Totals per day, client and provider for the last `days` days, newest first."""
+    since = (datetime.now() - timedelta(days=days - 1)).strftime('%Y-%m-%d')
+    with _connect() as connection:
+        connection.row_factory = sqlite3.Row
+        rows = connection.execute("""
+            SELECT day, client_id, provider,
+                   COUNT(*) AS calls,
+                   SUM(prompt_tokens) AS prompt_tokens,
+                   SUM(cached_tokens) AS cached_tokens,
+                   SUM(completion_tokens) AS completion_tokens,
+                   ROUND(AVG(latency_ms), 1) AS avg_latency_ms,
+                   ROUND(SUM(cost_usd), 4) AS cost_usd
+            FROM usage
+            WHERE day >= ?
+            GROUP BY day, client_id, provider
+            ORDER BY day DESC, cost_usd DESC
+        """, (since,)).fetchall()
+    return [dict(row) for row in rows]
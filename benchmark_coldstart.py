@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Measure cold-start and first-request latency
+
+Each run starts a fresh Python process (like a Render container waking up),
+imports the Flask app, optionally runs the pre-fork warm-up, and times the
+first request to each endpoint with Flask's test client. No OpenAI calls are
+made.
+
+Usage:
+  python benchmark_coldstart.py [--runs 5]
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+
+CHILD_SCRIPT = r'''
+import json, os, sys, time
+os.environ.setdefault('OPENAI_API_KEY', 'sk-benchmark')
+sys.path.insert(0, 'backend/api')
+warm = sys.argv[1] == 'warm'
+
+timings = {}
+start = time.perf_counter()
+import app as backend_app
+timings['import'] = time.perf_counter() - start
+
+if warm:
+    if not hasattr(backend_app, 'warm_up'):
+        print(json.dumps(None))
+        sys.exit(0)
+    start = time.perf_counter()
+    backend_app.warm_up()
+    timings['warm_up'] = time.perf_counter() - start
+
+client = backend_app.app.test_client()
+
+start = time.perf_counter()
+client.get('/api/health')
+timings['first /api/health'] = time.perf_counter() - start
+
+start = time.perf_counter()
+client.get('/')
+timings['first /'] = time.perf_counter() - start
+
+start = time.perf_counter()
+client.post('/api/download/docx', json={'content': '# Title\n\nSome **bold** text', 'filename': 'a.docx'})
+timings['first /api/download/docx'] = time.perf_counter() - start
+
+start = time.perf_counter()
+backend_app.load_prompt_template()
+backend_app.get_llm_provider().client()
+timings['first prompt + client'] = time.perf_counter() - start
+
+print(json.dumps(timings))
+'''
+
+
+def run_once(mode):
+    output = subprocess.run(
+        [sys.executable, '-c', CHILD_SCRIPT, mode],
+        capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark cold start and first-request latency")
+    parser.add_argument('--runs', type=int, default=5, help="Fresh processes per mode (median is reported)")
+    args = parser.parse_args()
+
+    for mode in ['cold', 'warm']:
+        runs = [run_once(mode) for _ in range(args.runs)]
+        if runs[0] is None:
+            print(f"\n{mode}: warm_up() not available")
+            continue
+
+        print(f"\n{mode} (median of {args.runs} runs, ms)")
+        for key in runs[0]:
+            values = sorted(run[key] * 1000 for run in runs)
+            print(f"  {key:<28} {values[len(values) // 2]:8.1f}")
+
+
+if __name__ == "__main__":
+    main()
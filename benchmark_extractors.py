@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Benchmark PDF text-extraction backends
+
+Runs every installed backend over a local folder of PDFs and reports
+throughput (pages/second) and output fidelity:
+- quality: the same 0-1 score 'auto' mode uses to reject poor output
+- agreement: word overlap with the reference backend's output
+
+Usage:
+  python benchmark_extractors.py <pdf_folder> [--reference pdfminer] [--repeat 3]
+"""
+
+import argparse
+import glob
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend', 'api'))
+
+import pdf_extractors
+
+
+def word_set(pages):
+    """Lowercased word set used to compare backends' output."""
+    return set(re.findall(r'\w+', " ".join(pages).lower()))
+
+
+def agreement(pages, reference_pages):
+    """Jaccard overlap between two extractions' vocabularies."""
+    words = word_set(pages)
+    reference = word_set(reference_pages)
+    if not words and not reference:
+        return 1.0
+    return len(words & reference) / len(words | reference)
+
+
+def run_backend(backend, pdf_paths, repeat):
+    """Extract every PDF with one backend, keeping the fastest of `repeat` runs."""
+    results = {}
+    for pdf_path in pdf_paths:
+        best_time = None
+        pages = None
+        try:
+            for _ in range(repeat):
+                start = time.perf_counter()
+                pages = pdf_extractors.EXTRACTORS[backend](pdf_path)
+                elapsed = time.perf_counter() - start
+                best_time = elapsed if best_time is None else min(best_time, elapsed)
+        except Exception as error:
+            print(f"  {backend} failed on {os.path.basename(pdf_path)}: {error}")
+            continue
+        results[pdf_path] = (pages, best_time)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark PDF extraction backends")
+    parser.add_argument('folder', help="Folder containing PDF files")
+    parser.add_argument('--reference', default='pdfminer', help="Backend used as the fidelity reference")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per file (fastest is kept)")
+    args = parser.parse_args()
+
+    pdf_paths = sorted(glob.glob(os.path.join(args.folder, '*.pdf')))
+    if not pdf_paths:
+        print(f"No PDF files found in {args.folder}")
+        sys.exit(1)
+
+    backends = pdf_extractors.available_backends()
+    if not backends:
+        print("No PDF extraction backends installed")
+        sys.exit(1)
+
+    reference = args.reference if args.reference in backends else backends[-1]
+
+    print("=" * 80)
+    print(f"Benchmarking {len(backends)} backends on {len(pdf_paths)} PDFs (reference: {reference})")
+    print("=" * 80)
+
+    all_results = {}
+    for backend in backends:
+        print(f"Running {backend}...")
+        all_results[backend] = run_backend(backend, pdf_paths, args.repeat)
+
+    reference_results = all_results[reference]
+
+    print("\n| Backend | Files OK | Pages/s | Chars | Avg quality | Avg agreement |")
+    print("| --- | --- | --- | --- | --- | --- |")
+    for backend in backends:
+        results = all_results[backend]
+        total_pages = sum(len(pages) for pages, _ in results.values())
+        total_time = sum(elapsed for _, elapsed in results.values())
+        total_chars = sum(len("".join(pages)) for pages, _ in results.values())
+        qualities = [pdf_extractors.text_quality(pages) for pages, _ in results.values()]
+        agreements = [
+            agreement(pages, reference_results[path][0])
+            for path, (pages, _) in results.items()
+            if path in reference_results
+        ]
+
+        pages_per_second = total_pages / total_time if total_time else 0
+        avg_quality = sum(qualities) / len(qualities) if qualities else 0
+        avg_agreement = sum(agreements) / len(agreements) if agreements else 0
+
+        print(f"| {backend} | {len(results)}/{len(pdf_paths)} | {pages_per_second:.1f} | "
+              f"{total_chars} | {avg_quality:.2f} | {avg_agreement:.2f} |")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Build fingerprinted, pre-compressed frontend assets
+
+Copies frontend/ into frontend/build/ with content-hashed filenames
+(app.3f2a9c1b7e.js), rewrites index.html to point at them and writes
+.gz and .br variants of every text asset next to the original. The Flask
+backend serves the build with long-lived immutable cache headers when
+frontend/build/manifest.json exists.
+
+Usage:
+  python build_assets.py [--frontend frontend]
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+
+# Assets referenced from index.html that get content-hashed names
+FINGERPRINTED = ['app.js', 'styles.css']
+# Files that get .gz/.br variants
+COMPRESSIBLE = {'.js', '.css', '.html', '.svg', '.json', '.ico'}
+
+
+def fingerprint(path):
+    """Short content hash used in the built filename."""
+    with open(path, 'rb') as file:
+        return hashlib.sha256(file.read()).hexdigest()[:10]
+
+
+def write_compressed(path):
+    """Write gzip (and brotli, if installed) variants of a file. Returns the sizes."""
+    with open(path, 'rb') as file:
+        data = file.read()
+
+    sizes = {'raw': len(data)}
+
+    # Tiny files can grow when compressed; those are served as-is
+    gzipped = gzip.compress(data, compresslevel=9, mtime=0)
+    if len(gzipped) < len(data):
+        with open(path + '.gz', 'wb') as file:
+            file.write(gzipped)
+        sizes['gzip'] = len(gzipped)
+
+    try:
+        import brotli
+    except ImportError:
+        return sizes
+
+    compressed = brotli.compress(data, quality=11)
+    if len(compressed) < len(data):
+        with open(path + '.br', 'wb') as file:
+            file.write(compressed)
+        sizes['br'] = len(compressed)
+
+    return sizes
+
+
+def build(frontend_path):
+    build_path = os.path.join(frontend_path, 'build')
+    if os.path.exists(build_path):
+        shutil.rmtree(build_path)
+    os.makedirs(build_path)
+
+    manifest = {}
+    for name in FINGERPRINTED:
+        stem, ext = os.path.splitext(name)
+        hashed = f"{stem}.{fingerprint(os.path.join(frontend_path, name))}{ext}"
+        shutil.copyfile(os.path.join(frontend_path, name), os.path.join(build_path, hashed))
+        manifest[name] = hashed
+
+    # index.html references the hashed names; it keeps its own name and is never cached long-term
+    with open(os.path.join(frontend_path, 'index.html'), 'r', encoding='utf-8') as file:
+        html = file.read()
+    for name, hashed in manifest.items():
+        html = re.sub(rf'((?:src|href)=")({re.escape(name)})(")', rf'\g<1>{hashed}\g<3>', html)
+    with open(os.path.join(build_path, 'index.html'), 'w', encoding='utf-8') as file:
+        file.write(html)
+
+    # Everything else (favicon, .nojekyll, ...) is copied unchanged
+    for name in os.listdir(frontend_path):
+        source = os.path.join(frontend_path, name)
+        if name in FINGERPRINTED or name == 'index.html' or not os.path.isfile(source):
+            continue
+        shutil.copyfile(source, os.path.join(build_path, name))
+
+    print(f"{'File':<28} {'Raw':>8} {'gzip':>8} {'br':>8}")
+    for name in sorted(os.listdir(build_path)):
+        if os.path.splitext(name)[1] not in COMPRESSIBLE:
+            continue
+        sizes = write_compressed(os.path.join(build_path, name))
+        print(f"{name:<28} {sizes['raw']:>8} {sizes.get('gzip', '-'):>8} {sizes.get('br', '-'):>8}")
+
+    with open(os.path.join(build_path, 'manifest.json'), 'w', encoding='utf-8') as file:
+        json.dump(manifest, file, indent=2)
+
+    print(f"\nBuilt assets in {build_path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build fingerprinted, pre-compressed frontend assets")
+    parser.add_argument('--frontend', default='frontend', help="Frontend source folder")
+    args = parser.parse_args()
+
+    build(args.frontend)
@@ -21,6 +21,15 @@ const errorSection = document.getElementById('errorSection');
 const errorMessage = document.getElementById('errorMessage');
 const downloadMarkdownBtn = document.getElementById('downloadMarkdown');
 const downloadDocxBtn = document.getElementById('downloadDocx');
+const regenerateOptions = document.getElementById('regenerateOptions');
+const sectionSelect = document.getElementById('sectionSelect');
+const regenerateBtn = document.getElementById('regenerateBtn');
+const browserExtract = document.getElementById('browserExtract');
+
+// pdf.js is only downloaded when browser-side extraction is first used
+const PDFJS_URL = 'https://cdn.jsdelivr.net/npm/pdfjs-dist@3.11.174/build/pdf.min.js';
+const PDFJS_WORKER_URL = 'https://cdn.jsdelivr.net/npm/pdfjs-dist@3.11.174/build/pdf.worker.min.js';
+let pdfjsLoading = null;
 
 let selectedFile = null;
 let analysisResult = null;
@@ -35,6 +44,7 @@ clearFileBtn.addEventListener('click', clearFileSelection);
 processBtn.addEventListener('click', processDocument);
 downloadMarkdownBtn.addEventListener('click', () => downloadFile('markdown'));
 downloadDocxBtn.addEventListener('click', () => downloadFile('docx'));
+regenerateBtn.addEventListener('click', regenerateSection);
 
 // Drag and drop functionality
 uploadArea.addEventListener('dragover', (e) => {
@@ -107,19 +117,41 @@ async function processDocument() {
     hideError();
 
     try {
-        // Create FormData
-        const formData = new FormData();
-        formData.append('file', selectedFile);
+        let response = null;
+
+        // Prefer sending only the text; fall back to the PDF if the browser can't read it
+        if (browserExtract.checked) {
+            try {
+                response = await analyzeTextInBrowser(selectedFile);
+                if (response.status === 422) {
+                    const errorData = await response.clone().json().catch(() => ({}));
+                    if (errorData.fallback === 'pdf') {
+                        response = null;
+                    }
+                }
+            } catch (error) {
+                console.warn('Browser extraction failed, uploading the PDF instead:', error);
+                response = null;
+            }
+        }
 
-        // Send to backend
-        const response = await fetch(`${API_URL}/api/analyze`, {
-            method: 'POST',
-            body: formData
-        });
+        if (!response) {
+            // Create FormData
+            const formData = new FormData();
+            formData.append('file', selectedFile);
+
+            // Send to backend
+            response = await fetch(`${API_URL}/api/analyze`, {
+                method: 'POST',
+                body: formData
+            });
+        }
 
         if (!response.ok) {
             const errorData = await response.json().catch(() => ({ error: 'Unknown error' }));
-            throw new Error(errorData.error || 'Failed to process document');
+            // The trace id lets the server logs explain which stage failed
+            const reference = errorData.trace_id ? ` (reference: ${errorData.trace_id})` : '';
+            throw new Error((errorData.error || 'Failed to process document') + reference);
         }
 
         const result = await response.json();
@@ -127,6 +159,7 @@ async function processDocument() {
 
         // Display results
         displayResults(result.markdown);
+        updateRegenerateOptions(result);
 
     } catch (error) {
         console.error('Processing error:', error);
@@ -147,6 +180,63 @@ async function processDocument() {
     }
 }
 
+function loadPdfJs() {
+    if (!pdfjsLoading) {
+        pdfjsLoading = new Promise((resolve, reject) => {
+            const script = document.createElement('script');
+            script.src = PDFJS_URL;
+            script.onload = () => {
+                window.pdfjsLib.GlobalWorkerOptions.workerSrc = PDFJS_WORKER_URL;
+                resolve(window.pdfjsLib);
+            };
+            script.onerror = () => {
+                pdfjsLoading = null;
+                reject(new Error('Failed to load pdf.js'));
+            };
+            document.head.appendChild(script);
+        });
+    }
+    return pdfjsLoading;
+}
+
+async function extractTextInBrowser(file) {
+    const pdfjs = await loadPdfJs();
+    const pdf = await pdfjs.getDocument({ data: await file.arrayBuffer() }).promise;
+    const pages = [];
+
+    try {
+        for (let number = 1; number <= pdf.numPages; number++) {
+            const page = await pdf.getPage(number);
+            const content = await page.getTextContent();
+            pages.push(content.items.map((item) => item.str + (item.hasEOL ? '\n' : '')).join(''));
+            page.cleanup();
+        }
+    } finally {
+        pdf.destroy();
+    }
+
+    // Form feeds separate pages so the server can score them like its own extractors
+    return pages.join('\f');
+}
+
+async function analyzeTextInBrowser(file) {
+    const text = await extractTextInBrowser(file);
+    const headers = { 'Content-Type': 'text/plain; charset=utf-8' };
+    let body = text;
+
+    if (typeof CompressionStream !== 'undefined') {
+        const stream = new Blob([text]).stream().pipeThrough(new CompressionStream('gzip'));
+        body = await new Response(stream).blob();
+        headers['Content-Encoding'] = 'gzip';
+    }
+
+    return fetch(`${API_URL}/api/analyze-text?filename=${encodeURIComponent(file.name)}`, {
+        method: 'POST',
+        headers: headers,
+        body: body
+    });
+}
+
 function displayResults(markdown) {
     // Convert markdown to HTML using marked.js
     markdownOutput.innerHTML = marked.parse(markdown);
@@ -158,9 +248,67 @@ function displayResults(markdown) {
 
 function hideResults() {
     resultsSection.style.display = 'none';
+    regenerateOptions.style.display = 'none';
     analysisResult = null;
 }
 
+function updateRegenerateOptions(result) {
+    // Only results the server kept can have single sections regenerated
+    if (!result.result_id || !result.sections || result.sections.length === 0) {
+        regenerateOptions.style.display = 'none';
+        return;
+    }
+
+    sectionSelect.innerHTML = '';
+    result.sections.forEach((section) => {
+        const option = document.createElement('option');
+        option.value = section;
+        option.textContent = section;
+        sectionSelect.appendChild(option);
+    });
+    regenerateOptions.style.display = 'flex';
+}
+
+async function regenerateSection() {
+    if (!analysisResult || !analysisResult.result_id) {
+        showError('No analysis results to regenerate.');
+        return;
+    }
+
+    regenerateBtn.disabled = true;
+    regenerateBtn.innerHTML = '<i class="fas fa-spinner fa-spin"></i> Regenerating...';
+    hideError();
+
+    try {
+        const response = await fetch(`${API_URL}/api/regenerate`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({
+                result_id: analysisResult.result_id,
+                section: sectionSelect.value
+            })
+        });
+
+        if (!response.ok) {
+            const errorData = await response.json().catch(() => ({ error: 'Unknown error' }));
+            throw new Error(errorData.error || 'Failed to regenerate section');
+        }
+
+        const result = await response.json();
+        analysisResult.markdown = result.markdown;
+        markdownOutput.innerHTML = marked.parse(result.markdown);
+
+    } catch (error) {
+        console.error('Regenerate error:', error);
+        showError(error.message);
+    } finally {
+        regenerateBtn.disabled = false;
+        regenerateBtn.innerHTML = '<i class="fas fa-redo"></i> Regenerate Section';
+    }
+}
+
 async function downloadFile(format) {
     if (!analysisResult) {
         showError('No analysis results to download.');
@@ -0,0 +1,35 @@
+"""
+Gunicorn configuration
+
+Loads the app once in the master process and warms it up before workers
+fork, so a container waking up on Render doesn't make the first request pay
+for heavy imports, client setup and template loading. Set PRELOAD_APP=false
+to go back to loading the app separately in every worker.
+"""
+
+import gc
+import os
+
+preload_app = os.getenv('PRELOAD_APP', 'true').lower() == 'true'
+
+
+def when_ready(server):
+    """Warm up in the master once the app is loaded, before any worker forks."""
+    if not preload_app:
+        return
+
+    from backend.api import app as backend_app
+    backend_app.warm_up()
+
+    # Move warmed objects out of GC tracking so workers don't copy those pages on write
+    gc.freeze()
+    server.log.info("App warmed up before fork")
+
+
+def post_fork(server, worker):
+    """Rebuild per-process state that must not be shared across forks."""
+    if not preload_app:
+        return
+
+    from backend.api import app as backend_app
+    backend_app.reset_after_fork()
@@ -62,6 +62,36 @@ def start_backend_server():
         sys.exit(1)
 
 
+def print_token_usage(days=7):
+    """Print token usage and estimated cost per day and client from the usage ledger."""
+    backend_path = os.path.join(os.path.dirname(__file__), 'backend', 'api')
+    sys.path.insert(0, backend_path)
+    import usage_ledger # type: ignore
+
+    if not os.path.exists(usage_ledger.LEDGER_PATH):
+        print(f"No usage recorded yet ({usage_ledger.LEDGER_PATH} not found)")
+        return
+
+    rows = usage_ledger.rollup(days)
+
+    print("=" * 50)
+    print(f"Token Usage (last {days} days)")
+    print("=" * 50)
+
+    if not rows:
+        print("No usage recorded.")
+    for row in rows:
+        print(f"{row['day']}  {row['client_id']:<20} {row['provider']:<10} calls: {row['calls']:<4} "
+              f"prompt: {row['prompt_tokens']:<8} cached: {row['cached_tokens']:<8} "
+              f"completion: {row['completion_tokens']:<8} avg: {row['avg_latency_ms']:.0f} ms  "
+              f"${row['cost_usd']:.4f}")
+
+    budget = usage_ledger.budget_status()
+    if budget['daily_budget_usd']:
+        print(f"\nToday: ${budget['spent_today_usd']:.4f} of ${budget['daily_budget_usd']:.2f} budget ({budget['mode']})")
+    print("=" * 50)
+
+
 def print_usage():
     """Print usage information."""
     print("\n" + "=" * 50)
@@ -70,6 +100,7 @@ def print_usage():
     print("\nUsage:")
     print("  python main.py check      - Verify API configuration")
     print("  python main.py server     - Start the backend server")
+    print("  python main.py usage      - Show token usage per day and client")
     print("  python main.py help       - Show this help message")
     print("\nFor setup instructions, see SETUP.md")
     print("=" * 50 + "\n")
@@ -89,6 +120,8 @@ if __name__ == "__main__":
             start_backend_server()
         else:
             sys.exit(1)
+    elif command == "usage":
+        print_token_usage(int(sys.argv[2]) if len(sys.argv) > 2 else 7)
     elif command == "help":
         print_usage()
     else:
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Test script for /api/analyze in single and parallel mode against recorded model responses
+Checks that every section comes back and that parallel mode sends each section to its model tier
+"""
+
+import io
+import os
+import sys
+import shutil
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend', 'api'))
+
+from test_support import make_pdf, scratch_environment, record, Checks
+
+
+def analyze(client, text, mode):
+    response = client.post(
+        '/api/analyze',
+        data={'file': (io.BytesIO(make_pdf([text])), 'paper.pdf'), 'mode': mode},
+        content_type='multipart/form-data'
+    )
+    return response.status_code, response.get_json()
+
+
+def ledger_rows():
+    connection = usage_ledger._connect()
+    try:
+        return connection.execute('SELECT provider, model, purpose FROM usage ORDER BY rowid').fetchall()
+    finally:
+        connection.close()
+
+
+if __name__ == '__main__':
+    work_dir = scratch_environment()
+
+    import app
+    import usage_ledger
+
+    _, sections = app.split_prompt_sections(app.load_prompt_template())
+    section_keys = [key for key, _ in sections]
+    recorded_analysis = {key: f"Recorded content of {key}" for key in section_keys}
+    record(os.environ['RECORDED_RESPONSES_DIR'], recorded_analysis)
+
+    client = app.app.test_client()
+    checks = Checks()
+
+    checks.section("TEST 1: Single Mode")
+    status, body = analyze(client, "Single mode paper about reading comprehension.", 'single')
+    print(f"Status: {status}, provider: {body.get('provider')}, recovery: {body.get('recovery')}")
+    checks.check("Request succeeded", status == 200 and body['success'])
+    checks.check("All sections returned", body['sections'] == section_keys)
+    checks.check("Recorded content rendered", all(value in body['markdown'] for value in recorded_analysis.values()))
+    checks.check("One call with the default tier", ledger_rows() == [('recorded', app.MODEL_TIERS['default']['model'], 'analysis')])
+
+    checks.section("TEST 2: Parallel Mode")
+    status, body = analyze(client, "Parallel mode paper about working memory.", 'parallel')
+    print(f"Status: {status}, provider: {body.get('provider')}, mode: {body.get('analysis_mode')}")
+    checks.check("Request succeeded", status == 200 and body['success'])
+    checks.check("Ran in parallel mode", body['analysis_mode'] == 'parallel')
+    checks.check("All sections returned in prompt order", body['sections'] == section_keys)
+    checks.check("Each section holds its own recorded content", all(value in body['markdown'] for value in recorded_analysis.values()))
+
+    calls = {purpose: model for _, model, purpose in ledger_rows()[1:]}
+    expected = {
+        f"section {key.split('.', 1)[0]}": app.MODEL_TIERS[app.SECTION_TIERS.get(key.split('.', 1)[0], 'default')]['model']
+        for key in section_keys
+    }
+    print(f"Models per section: {calls}")
+    checks.check("One call per section, each with its tier's model", calls == expected)
+
+    checks.section("TEST 3: Unknown Mode")
+    status, body = analyze(client, "Any paper.", 'sequential')
+    checks.check("Rejected with a 400", status == 400 and 'Unknown analysis mode' in body['error'])
+
+    status = checks.finish()
+    shutil.rmtree(work_dir, ignore_errors=True)
+    sys.exit(status)
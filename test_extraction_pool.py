@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Test script for sandboxed PDF extraction workers
+Drives the timeout and memory kill paths and checks that the pool recovers
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend', 'api'))
+
+from test_support import make_pdf, Checks
+
+if __name__ == '__main__':
+    import extraction_pool
+
+    work_dir = tempfile.mkdtemp(prefix='paper_analyzer_test_')
+    small_pdf = os.path.join(work_dir, 'small.pdf')
+    large_pdf = os.path.join(work_dir, 'large.pdf')
+    with open(small_pdf, 'wb') as file:
+        file.write(make_pdf(["A short paper about reading."]))
+    with open(large_pdf, 'wb') as file:
+        file.write(make_pdf([50] * 400))
+
+    checks = Checks()
+    extraction_pool.start()
+
+    checks.section("TEST 1: Normal Extraction")
+    pages, backend, quality = extraction_pool.extract(small_pdf)
+    print(f"Backend: {backend}, pages: {len(pages)}, quality: {quality:.2f}")
+    checks.check("Text extracted", 'short paper about reading' in pages[0])
+    checks.check("Counted as completed", extraction_pool.counters['completed'] == 1)
+
+    checks.section("TEST 2: Timeout Kill")
+    try:
+        extraction_pool.extract(large_pdf, timeout=0.01)
+        killed = None
+    except extraction_pool.ExtractionKilled as error:
+        killed = str(error)
+    print(f"Error: {killed}")
+    checks.check("Killed with a timeout message", killed is not None and 'took longer than' in killed)
+    checks.check("Counted as a timeout kill", extraction_pool.counters['killed_timeout'] == 1)
+    checks.check("Replacement worker started", extraction_pool.stats()['workers'] == extraction_pool.EXTRACTION_WORKERS)
+
+    checks.section("TEST 3: Memory Kill")
+    if extraction_pool.MEMORY_LIMIT_ENFORCED:
+        # Workers pick up the cap when they start, so replace the pool with capped workers
+        extraction_pool.EXTRACTION_MAX_RSS_MB = 20
+        extraction_pool.reset()
+        extraction_pool.start()
+        try:
+            extraction_pool.extract(large_pdf)
+            killed = None
+        except extraction_pool.ExtractionKilled as error:
+            killed = str(error)
+        print(f"Error: {killed}")
+        checks.check("Killed with a memory message", killed is not None and 'more than 20 MB of memory' in killed)
+        checks.check("Counted as a memory kill", extraction_pool.counters['killed_memory'] == 1)
+        checks.check("Not counted as a crash", extraction_pool.counters['crashed'] == 0)
+    else:
+        print("Memory limits aren't enforced on this platform, skipped")
+
+    checks.section("TEST 4: Pool Recovers After Kills")
+    pages, _, _ = extraction_pool.extract(small_pdf)
+    checks.check("Replacement worker extracts the next document", 'short paper about reading' in pages[0])
+
+    status = checks.finish()
+    shutil.rmtree(work_dir, ignore_errors=True)
+    sys.exit(status)
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Test script for hedged model calls
+Checks that a slow primary is hedged to the backup, that both attempts are billed, and that the losing stream is closed at once
+"""
+
+import io
+import os
+import sys
+import time
+import shutil
+import threading
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend', 'api'))
+
+from test_support import make_pdf, scratch_environment, record, Checks
+
+# How long the stalled stream would send nothing if it weren't closed
+STALL_SECONDS = 10
+
+
+class StalledStream:
+    """A stream that sends nothing until it's closed, like a server that hasn't produced a first token."""
+
+    def __init__(self):
+        self.closed = threading.Event()
+
+    def __iter__(self):
+        self.closed.wait(STALL_SECONDS)
+        # What reading a closed response raises
+        raise ConnectionError("stream closed")
+
+    def close(self):
+        self.closed.set()
+
+
+def stalled_client(streams):
+    def create(**kwargs):
+        streams.append(StalledStream())
+        return streams[-1]
+    return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+
+def analyze(client, text):
+    response = client.post(
+        '/api/analyze',
+        data={'file': (io.BytesIO(make_pdf([text])), 'paper.pdf'), 'mode': 'single'},
+        content_type='multipart/form-data'
+    )
+    return response.status_code, response.get_json()
+
+
+def ledger_providers():
+    connection = usage_ledger._connect()
+    try:
+        return [row[0] for row in connection.execute('SELECT provider FROM usage ORDER BY rowid')]
+    finally:
+        connection.close()
+
+
+if __name__ == '__main__':
+    work_dir = scratch_environment()
+
+    import app
+    import llm_providers
+    import usage_ledger
+
+    recorded_dir = os.environ['RECORDED_RESPONSES_DIR']
+    _, sections = app.split_prompt_sections(app.load_prompt_template())
+    recorded_analysis = {key: f"Recorded content of {key}" for key, _ in sections}
+    record(recorded_dir, recorded_analysis)
+    model = app.MODEL_TIERS['default']['model']
+    llm_providers.HEDGE_MAX_FRACTION = 1.0
+    client = app.app.test_client()
+    checks = Checks()
+
+    checks.section("TEST 1: Slow Primary Is Hedged")
+    # First token after 2s, while the p95 says to hedge after ~10ms
+    slow_dir = os.path.join(work_dir, 'recorded_slow')
+    record(slow_dir, recorded_analysis, latency=2)
+    llm_providers._providers['slow'] = llm_providers.RecordedProvider('slow', slow_dir)
+    app.LLM_PROVIDER, app.LLM_BACKUP_PROVIDER = 'slow', 'recorded'
+    for _ in range(llm_providers.HEDGE_MIN_SAMPLES):
+        llm_providers.tracker.observe('slow', model, 0.01)
+
+    billed = len(ledger_providers())
+    status, body = analyze(client, "Hedged paper about attention.")
+    print(f"Status: {status}, provider: {body.get('provider')}, hedged calls: {body.get('hedged_calls')}")
+    checks.check("Request succeeded", status == 200 and body['success'])
+    checks.check("Backup won the race", body['provider'] == 'recorded' and body['hedged_calls'] == 1)
+    # The cancelled attempt records its usage when it stops, possibly after the response
+    deadline = time.monotonic() + 2
+    while len(ledger_providers()) < billed + 2 and time.monotonic() < deadline:
+        time.sleep(0.05)
+    checks.check("Both attempts billed, the cancelled one too", sorted(ledger_providers()[billed:]) == ['recorded', 'slow'])
+
+    checks.section("TEST 2: Losing Stream Is Closed by the Winner")
+    streams = []
+    stalled = llm_providers.OpenAIProvider('stalled', 'test-key')
+    stalled._client = stalled_client(streams)
+    llm_providers._providers['stalled'] = stalled
+    for _ in range(llm_providers.HEDGE_MIN_SAMPLES):
+        llm_providers.tracker.observe('stalled', model, 0.01)
+
+    finished = {}
+    cancelled = threading.Event()
+
+    def on_usage(provider_name, model_name, usage, latency):
+        finished[provider_name] = time.perf_counter()
+        if provider_name == 'stalled':
+            cancelled.set()
+
+    start = time.perf_counter()
+    messages = [{'role': 'user', 'content': 'A paper about working memory.'}]
+    content = llm_providers.complete(messages, app.MODEL_TIERS['default'], 'stalled', 'recorded', on_usage=on_usage)
+    won = time.perf_counter()
+    cancelled.wait(STALL_SECONDS)
+    print(f"Backup won after {won - start:.2f}s, stalled attempt stopped {finished.get('stalled', won) - won:.3f}s later")
+    checks.check("Backup's content returned", 'Recorded content' in content)
+    checks.check("Losing stream closed", len(streams) == 1 and streams[0].closed.is_set())
+    checks.check("Losing attempt stopped at once, not when a chunk arrived", 'stalled' in finished and finished['stalled'] - won < 1)
+
+    checks.section("TEST 3: Cancel")
+    stream = StalledStream()
+    cancel = llm_providers.Cancel()
+    cancel.set()
+    cancel.attach(stream)
+    checks.check("Stream attached after the cancel is closed right away", stream.closed.is_set())
+    # A stream whose connection drops while nobody cancelled it
+    streams.clear()
+    stalled._client = stalled_client(streams)
+    threading.Timer(0.1, lambda: streams[0].close()).start()
+    try:
+        stalled.complete(messages, app.MODEL_TIERS['default'], cancel=llm_providers.Cancel())
+        raised = None
+    except Exception as error:
+        raised = error
+    checks.check("Errors on a call that wasn't cancelled still raise", raised is not None and not isinstance(raised, llm_providers.StreamCancelled))
+
+    status = checks.finish()
+    shutil.rmtree(work_dir, ignore_errors=True)
+    sys.exit(status)
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Test script for the per-request memory budget
+Checks the downgrades of oversized text, that a budget of 0 disables them, and the PDF size check
+"""
+
+import os
+import sys
+import shutil
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend', 'api'))
+
+from test_support import make_pdf, scratch_environment, record, Checks, WORDS
+
+
+def analyze_text(client, text, mode):
+    response = client.post(f'/api/analyze-text?mode={mode}', data=text.encode('utf-8'), content_type='text/plain')
+    return response.status_code, response.get_json()
+
+
+if __name__ == '__main__':
+    work_dir = scratch_environment()
+
+    import app
+    import memory_budget
+
+    _, sections = app.split_prompt_sections(app.load_prompt_template())
+    record(os.environ['RECORDED_RESPONSES_DIR'], {key: f"Recorded content of {key}" for key, _ in sections})
+    client = app.app.test_client()
+    checks = Checks()
+
+    checks.section("TEST 1: reduce_text")
+    text = "".join(str(i % 10) for i in range(1000))
+    checks.check("Short text is unchanged", app.reduce_text(text, 2000) == text)
+    reduced = app.reduce_text(text, 100)
+    checks.check("Keeps 70 characters of the start and 30 of the end", reduced.startswith(text[:70]) and reduced.endswith(text[-30:]))
+    reduced = app.reduce_text(text, 0)
+    checks.check("A limit of 0 keeps none of the text", not any(char.isdigit() for char in reduced))
+
+    # About 120 KB of words: 8 copies in single mode fit 1 MB, 40 copies in parallel mode don't
+    paper = " ".join(WORDS[i % len(WORDS)] for i in range(24000))
+
+    checks.section("TEST 2: Budget of 0 Disables the Downgrades")
+    memory_budget.MEMORY_BUDGET_MB = 0
+    status, body = analyze_text(client, paper, 'parallel')
+    print(f"Status: {status}, mode: {body.get('analysis_mode')}, downgrades: {body['memory']['downgrades']}")
+    checks.check("Still runs in parallel mode", status == 200 and body['analysis_mode'] == 'parallel')
+    checks.check("No downgrades reported", body['memory']['downgrades'] == [])
+
+    checks.section("TEST 3: Parallel Falls Back to Single Mode")
+    memory_budget.MEMORY_BUDGET_MB = 1
+    status, body = analyze_text(client, paper + " single", 'parallel')
+    print(f"Status: {status}, mode: {body.get('analysis_mode')}, downgrades: {body['memory']['downgrades']}")
+    checks.check("Runs in single mode", status == 200 and body['analysis_mode'] == 'single')
+    checks.check("Only the mode was downgraded", body['memory']['downgrades'] == ['parallel -> single mode'])
+
+    checks.section("TEST 4: Text Is Shortened When Single Mode Doesn't Fit Either")
+    memory_budget.MEMORY_BUDGET_MB = 0.5
+    status, body = analyze_text(client, paper + " shortened", 'single')
+    downgrades = body['memory']['downgrades']
+    print(f"Status: {status}, downgrades: {downgrades}")
+    max_chars = memory_budget.max_text_chars(paper + " shortened\n", 'single')
+    checks.check("Text reduced to what fits", status == 200 and downgrades == [f'text reduced to {max_chars} characters'])
+    checks.check("Reduced text is shorter than the paper", 0 < max_chars < len(paper))
+
+    checks.section("TEST 5: PDF Size Check Scales With Pages, Not Just Bytes")
+    import pdf_extractors
+
+    memory_budget.MEMORY_BUDGET_MB = 64
+    pdf_path = os.path.join(work_dir, 'three_pages.pdf')
+    with open(pdf_path, 'wb') as file:
+        file.write(make_pdf([10, 10, 10]))
+    checks.check("Page count read from the page tree", pdf_extractors.page_count(pdf_path) == 3)
+    checks.check("Unreadable file has no page count", pdf_extractors.page_count(__file__) is None)
+
+    def fits(pdf_bytes, pages):
+        try:
+            memory_budget.check_pdf_size(pdf_bytes, pages)
+            return True
+        except memory_budget.MemoryBudgetExceeded:
+            return False
+
+    checks.check("10 MB figure-heavy paper with 12 pages fits", fits(10 * memory_budget.MB, 12))
+    checks.check("3 MB text-heavy document with 2,000 pages fits", fits(3 * memory_budget.MB, 2000))
+    checks.check("5,000 text-heavy pages don't fit", not fits(3 * memory_budget.MB, 5000))
+    checks.check("60 MB file doesn't fit", not fits(60 * memory_budget.MB, None))
+
+    status = checks.finish()
+    shutil.rmtree(work_dir, ignore_errors=True)
+    sys.exit(status)
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Test script for the related-paper similarity index
+Checks appending papers, ranking queries, the exclude and similarity filters, and recovery from an interrupted append
+"""
+
+import os
+import sys
+import shutil
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend', 'api'))
+
+from test_support import scratch_environment, Checks
+
+PAPERS = {
+    'Memory (2020)': "working memory capacity predicts reading comprehension in older adults "
+                     "working memory span tasks and reading comprehension scores",
+    'Sleep (2021)': "sleep deprivation impairs attention and vigilance in shift workers "
+                    "sleep duration and attention lapses during night shifts",
+    'Plants (2019)': "nitrogen fertilizer increases wheat yield in drought conditions "
+                     "soil nitrogen and crop yield across irrigation levels",
+}
+
+
+if __name__ == '__main__':
+    work_dir = scratch_environment()
+
+    import paper_index
+
+    checks = Checks()
+
+    checks.section("TEST 1: Empty Index")
+    checks.check("Query on an empty index finds nothing", paper_index.query(["anything at all"]) == [[]])
+
+    checks.section("TEST 2: Appending Papers")
+    added = [paper_index.add_paper(text, citation) for citation, text in PAPERS.items()]
+    checks.check("Every paper added", added == [True, True, True])
+    checks.check("Same text not added twice", paper_index.add_paper(PAPERS['Sleep (2021)'], 'Sleep again') is False)
+    vectors_path, papers_path, _ = paper_index._paths()
+    checks.check("One row and one metadata line per paper",
+                 os.path.getsize(vectors_path) == 3 * paper_index.N_FEATURES * 4
+                 and [paper['citation'] for paper in paper_index.load_papers()] == list(PAPERS))
+
+    checks.section("TEST 3: Queries")
+    results = paper_index.query([
+        "reading comprehension and working memory in aging",
+        "attention lapses after sleep loss",
+    ], k=2)
+    print(f"Results: {results}")
+    checks.check("One result list per text", len(results) == 2)
+    checks.check("Closest paper ranked first", results[0][0]['citation'] == 'Memory (2020)' and results[1][0]['citation'] == 'Sleep (2021)')
+    checks.check("At most k matches, best first", all(len(matches) <= 2 and matches == sorted(matches, key=lambda match: -match['similarity']) for matches in results))
+    own = paper_index.query([PAPERS['Plants (2019)']], k=1)[0][0]
+    checks.check("A paper is most similar to itself", own['citation'] == 'Plants (2019)' and own['similarity'] > 0.99)
+
+    checks.section("TEST 4: Filters")
+    own_hash = paper_index.text_hash(PAPERS['Memory (2020)'])
+    matches = paper_index.query([PAPERS['Memory (2020)']], k=3, exclude_hashes={own_hash})[0]
+    checks.check("Excluded paper skipped", all(match['hash'] != own_hash for match in matches))
+    matches = paper_index.query(["working memory and reading comprehension"], k=3, min_similarity=0.2)[0]
+    print(f"Above 0.2: {matches}")
+    checks.check("Papers below min_similarity dropped", [match['citation'] for match in matches] == ['Memory (2020)'])
+
+    checks.section("TEST 5: Appending After a Query")
+    paper_index.add_paper("bilingual children show stronger executive control in attention tasks", 'Bilingual (2022)')
+    matches = paper_index.query(["executive control in bilingual children"], k=1)[0]
+    checks.check("New paper found without a restart", matches and matches[0]['citation'] == 'Bilingual (2022)')
+    checks.check("Cached weights cover the new row", paper_index._cache['rows'] == 4)
+
+    checks.section("TEST 6: Interrupted Append")
+    # A row written without its metadata line, as if the append died in between
+    with open(vectors_path, 'ab') as file:
+        file.write(paper_index.vectorize("an orphaned row").tobytes())
+    checks.check("Row without metadata ignored by queries", len(paper_index.query(["orphaned row"], k=10)[0]) == 4)
+    paper_index.add_paper("volcanic ash affects regional rainfall patterns", 'Volcano (2018)')
+    checks.check("Next append replaces the orphaned row", os.path.getsize(vectors_path) == 5 * paper_index.N_FEATURES * 4)
+    matches = paper_index.query(["volcanic ash and rainfall"], k=1)[0]
+    checks.check("Appended row lines up with its metadata", matches[0]['citation'] == 'Volcano (2018)')
+
+    status = checks.finish()
+    shutil.rmtree(work_dir, ignore_errors=True)
+    sys.exit(status)
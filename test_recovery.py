@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Test script for recovering broken analysis responses
+Drives recover_analysis through its continuation call, repair call and raw-text fallback with recorded replies
+"""
+
+import os
+import sys
+import json
+import shutil
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend', 'api'))
+
+from test_support import scratch_environment, record, Checks
+
+if __name__ == '__main__':
+    work_dir = scratch_environment()
+
+    import app
+
+    recorded_dir = os.environ['RECORDED_RESPONSES_DIR']
+    prompt_template = app.load_prompt_template()
+    _, sections = app.split_prompt_sections(prompt_template)
+    keys = [key for key, _ in sections]
+    full = {key: f"Content of {key}" for key in keys}
+    paper = "A paper about reading comprehension in older adults."
+    checks = Checks()
+
+    def reply(content):
+        """Make the next model call answer with `content` (None: no recording, the call fails)."""
+        path = os.path.join(recorded_dir, 'default.json')
+        if content is None:
+            if os.path.exists(path):
+                os.remove(path)
+        else:
+            record(recorded_dir, content)
+
+    def recover(response_text):
+        app.llm_providers.current_calls.set([])
+        return app.recover_analysis(response_text, paper, prompt_template)
+
+    # The response stops inside section 3, so sections 3 onwards are requested again
+    truncated = json.dumps({key: full[key] for key in keys[:3]})[:-10]
+
+    checks.section("TEST 1: Valid and Locally Repairable Responses")
+    analysis, recovery = recover(f"```json\n{json.dumps(full)}\n```")
+    checks.check("Valid response is used as-is", recovery == 'none' and analysis == full)
+    analysis, recovery = recover(json.dumps(full)[:-1] + ",}")
+    checks.check("Trailing comma repaired locally", recovery == 'local' and analysis == full)
+
+    checks.section("TEST 2: Truncated Response, Continuation Returns Every Missing Section")
+    reply({key: full[key] for key in keys[2:]})
+    analysis, recovery = recover(truncated)
+    print(f"Recovery: {recovery}")
+    checks.check("Recovered by continuation", recovery == 'continuation')
+    checks.check("All sections present and complete", analysis == full and app.is_complete_analysis(analysis))
+
+    checks.section("TEST 3: Continuation Leaves a Section Out")
+    reply({key: full[key] for key in keys[3:]})
+    analysis, recovery = recover(truncated)
+    print(f"Recovery: {recovery}, section 3: {analysis.get(keys[2])!r}")
+    checks.check("Missing section gets a placeholder", analysis.get(keys[2]) == app.SECTION_MISSING)
+    checks.check("Other sections kept", all(analysis[key] == full[key] for key in keys if key != keys[2]))
+    checks.check("Result is not complete (won't be reused)", not app.is_complete_analysis(analysis))
+
+    checks.section("TEST 4: Continuation Call Fails")
+    reply(None)
+    analysis, recovery = recover(truncated)
+    print(f"Recovery: {recovery}")
+    checks.check("Falls back to the locally repaired part", recovery == 'local')
+    checks.check("Finished sections kept", all(analysis[key] == full[key] for key in keys[:2]))
+    checks.check("Unfinished sections get placeholders", all(analysis[key] == app.SECTION_MISSING for key in keys[2:]))
+
+    # Complete but invalid (missing comma), so it can't be repaired locally
+    malformed = json.dumps(full).replace(', "', ' "', 1)
+
+    checks.section("TEST 5: Repair Call Fixes Malformed JSON")
+    reply(full)
+    analysis, recovery = recover(malformed)
+    print(f"Recovery: {recovery}")
+    checks.check("Recovered by the repair call", recovery == 'repair_call' and analysis == full)
+
+    checks.section("TEST 6: Repair Call Drops Sections")
+    reply({key: full[key] for key in keys[1:]})
+    analysis, recovery = recover(malformed)
+    print(f"Recovery: {recovery}")
+    checks.check("Rejected, raw text returned", recovery == 'failed' and analysis == malformed)
+
+    checks.section("TEST 7: Repair Call Fails")
+    reply(None)
+    analysis, recovery = recover(malformed)
+    checks.check("Raw text returned", recovery == 'failed' and analysis == malformed)
+
+    checks.section("TEST 8: No JSON at All")
+    analysis, recovery = recover("I'm sorry, I can't analyze this paper.")
+    checks.check("Raw text returned without a model call", recovery == 'failed' and app.llm_providers.current_calls.get() == [])
+
+    status = checks.finish()
+    shutil.rmtree(work_dir, ignore_errors=True)
+    sys.exit(status)
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Test script for regenerating one section of a stored result (/api/regenerate)
+Checks that only the section is replaced, that it is regenerated from the same text the analysis used, and the error cases
+"""
+
+import os
+import sys
+import shutil
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend', 'api'))
+
+from test_support import scratch_environment, record, Checks, WORDS
+
+
+def analyze_text(client, text):
+    response = client.post('/api/analyze-text?mode=single', data=text.encode('utf-8'), content_type='text/plain')
+    return response.status_code, response.get_json()
+
+
+def regenerate(client, payload):
+    response = client.post('/api/regenerate', json=payload)
+    return response.status_code, response.get_json()
+
+
+if __name__ == '__main__':
+    work_dir = scratch_environment()
+
+    import app
+    import result_store
+    import memory_budget
+
+    recorded_dir = os.environ['RECORDED_RESPONSES_DIR']
+    _, sections = app.split_prompt_sections(app.load_prompt_template())
+    keys = [key for key, _ in sections]
+    full = {key: f"Recorded content of {key}" for key in keys}
+    record(recorded_dir, full)
+    client = app.app.test_client()
+    checks = Checks()
+
+    # Remember the user message of every model call
+    prompts = []
+    chat_completion = app.chat_completion
+
+    def recording_chat_completion(messages, *args, **kwargs):
+        prompts.append(messages[-1]['content'])
+        return chat_completion(messages, *args, **kwargs)
+
+    app.chat_completion = recording_chat_completion
+
+    paper = " ".join(WORDS[i % len(WORDS)] for i in range(40000))
+    status, body = analyze_text(client, paper)
+    result_id = body['result_id']
+
+    checks.section("TEST 1: Regenerate One Section")
+    record(recorded_dir, {keys[7]: "A sharper appraisal."})
+    prompts.clear()
+    status, body = regenerate(client, {'result_id': result_id, 'section': '8'})
+    print(f"Status: {status}, section: {body.get('section')}")
+    checks.check("Section resolved from its number", status == 200 and body['section'] == keys[7])
+    checks.check("Section markdown returned", 'A sharper appraisal.' in body['section_markdown'])
+    _, stored, _ = result_store.load(result_id)
+    checks.check("Only that section replaced in the stored result", stored == dict(full, **{keys[7]: "A sharper appraisal."}))
+    checks.check("Other sections sent as context", len(prompts) == 1 and full[keys[0]] in prompts[0])
+    checks.check("Paper text sent in full", paper in prompts[0])
+
+    checks.section("TEST 2: Regenerated From the Text the Analysis Used")
+    # A budget the paper doesn't fit: the analysis and the regeneration both shorten it the same way
+    memory_budget.MEMORY_BUDGET_MB = 1
+    record(recorded_dir, full)
+    prompts.clear()
+    status, body = analyze_text(client, paper + " budget")
+    analysis_prompt = prompts[-1]
+    print(f"Analysis downgrades: {body['memory']['downgrades']}")
+    record(recorded_dir, {keys[2]: "New framework section."})
+    prompts.clear()
+    status, body = regenerate(client, {'result_id': body['result_id'], 'section': keys[2]})
+    print(f"Regeneration downgrades: {body['memory']['downgrades']}")
+    stored_text = paper + " budget\n"
+    max_chars = memory_budget.max_text_chars(stored_text, 'single')
+    checks.check("Regeneration reports the same reduction", status == 200 and body['memory']['downgrades'] == [f'text reduced to {max_chars} characters'])
+    reduced = app.reduce_text(stored_text, max_chars)
+    checks.check("Analysis and regeneration sent the same reduced text", reduced in analysis_prompt and reduced in prompts[0] and paper not in prompts[0])
+    memory_budget.MEMORY_BUDGET_MB = 64
+
+    checks.section("TEST 3: Errors")
+    status, body = regenerate(client, {'result_id': result_id})
+    checks.check("Missing section gets a 400", status == 400)
+    status, body = regenerate(client, {'result_id': result_id, 'section': '42'})
+    checks.check("Unknown section gets a 400", status == 400 and 'Unknown section' in body['error'])
+    status, body = regenerate(client, {'result_id': '0' * 32, 'section': '8'})
+    checks.check("Unknown result gets a 404", status == 404)
+    status, body = regenerate(client, {'result_id': '../../etc', 'section': '8'})
+    checks.check("Malformed result id gets a 404", status == 404)
+
+    status = checks.finish()
+    shutil.rmtree(work_dir, ignore_errors=True)
+    sys.exit(status)
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Test script for local repair of truncated and malformed JSON responses
+Covers the ways a model response usually breaks and the cut-back path
+"""
+
+import sys
+sys.path.insert(0, 'backend/api')
+
+import response_repair
+from response_repair import repair_json, extract_json_candidate
+
+# (name, response text, expected data, expected truncated flag)
+repair_cases = [
+    (
+        "Complete object in a code fence",
+        'Here is the analysis:\n```json\n{"1. Full Citation": "Smith 2020"}\n```\nDone.',
+        {"1. Full Citation": "Smith 2020"},
+        False
+    ),
+    (
+        "Trailing commas",
+        '{"tags": ["a", "b",], "summary": "ok",}',
+        {"tags": ["a", "b"], "summary": "ok"},
+        False
+    ),
+    (
+        "Raw newline inside a string",
+        '{"summary": "line one\nline two"}',
+        {"summary": "line one\nline two"},
+        False
+    ),
+    (
+        "Truncated inside a string",
+        '{"1. Full Citation": "Smith 2020", "2. Summary": "The study fou',
+        {"1. Full Citation": "Smith 2020", "2. Summary": "The study fou"},
+        True
+    ),
+    (
+        "Truncated inside an escaped quote",
+        '{"quote": "He said \\"stop',
+        {"quote": 'He said "stop'},
+        True
+    ),
+    (
+        "Dangling key",
+        '{"1. Full Citation": "Smith 2020", "2. Summary"',
+        {"1. Full Citation": "Smith 2020"},
+        True
+    ),
+    (
+        "Dangling key and colon",
+        '{"1. Full Citation": "Smith 2020", "2. Summary": ',
+        {"1. Full Citation": "Smith 2020"},
+        True
+    ),
+    (
+        "Truncated in nested arrays",
+        '{"findings": [[1, 2], [3, 4',
+        {"findings": [[1, 2], [3, 4]]},
+        True
+    ),
+    (
+        "Truncated in an object inside an array",
+        '{"rows": [{"name": "Alice", "score": 95}, {"name": "Bob", "sco',
+        {"rows": [{"name": "Alice", "score": 95}, {"name": "Bob"}]},
+        True
+    ),
+    (
+        "Truncated after a trailing comma",
+        '{"tags": ["a", "b",',
+        {"tags": ["a", "b"]},
+        True
+    ),
+    (
+        "Cut back past a partial literal",
+        '{"1. Full Citation": "Smith 2020", "flag": tr',
+        {"1. Full Citation": "Smith 2020"},
+        True
+    ),
+    (
+        "Cut back past a partial number exponent",
+        '{"a": [1, 2], "b": {"c": 1.5e',
+        {"a": [1, 2]},
+        True
+    ),
+    (
+        "No JSON at all",
+        'Sorry, I cannot help with that.',
+        None,
+        False
+    ),
+    (
+        "Top-level array is not an analysis",
+        '[1, 2, 3]',
+        None,
+        False
+    ),
+]
+
+if __name__ == '__main__':
+    print("=" * 80)
+    print("TESTING RESPONSE REPAIR")
+    print("=" * 80)
+
+    failures = 0
+    for test_name, response_text, expected_data, expected_truncated in repair_cases:
+        data, truncated = repair_json(response_text)
+        passed = data == expected_data and truncated == expected_truncated
+        failures += not passed
+        print(f"\n--- Test: {test_name} ---")
+        print(f"Input: {response_text!r}")
+        print(f"Output: {data!r} (truncated={truncated})")
+        print("PASS" if passed else f"FAIL: expected {expected_data!r} (truncated={expected_truncated})")
+
+    print("\n" + "=" * 80)
+    print("TEST 2: Candidate Extraction")
+    print("=" * 80)
+
+    candidate_cases = [
+        ('prefix {"a": 1}\n```', '{"a": 1}'),
+        ('```json\n{"a": 1}   \n```', '{"a": 1}'),
+        ('no braces here', None),
+    ]
+    for response_text, expected in candidate_cases:
+        candidate = extract_json_candidate(response_text)
+        passed = candidate == expected
+        failures += not passed
+        print(f"{response_text!r} -> {candidate!r}: {'PASS' if passed else f'FAIL: expected {expected!r}'}")
+
+    print("\n" + "=" * 80)
+    print("TEST 3: Cut-back Attempts Are Capped")
+    print("=" * 80)
+
+    # Every value after the first is broken, so only cutting back to the first one parses
+    broken_values = ", ".join(f'"k{i}": tr' for i in range(response_repair.MAX_CUT_ATTEMPTS + 10))
+    data, truncated = repair_json('{"first": 1, ' + broken_values)
+    passed = data is None and truncated
+    failures += not passed
+    print(f"{response_repair.MAX_CUT_ATTEMPTS + 10} broken values after the last good one -> {data!r}: {'PASS' if passed else 'FAIL: expected None'}")
+
+    print("\n" + "=" * 80)
+    print("TEST 4: Top-level Keys of Broken JSON")
+    print("=" * 80)
+
+    key_cases = [
+        ('{"a": 1, "b": {"c": "x:y"} "d": [1, 2]}', ['a', 'b', 'd']),
+        ('{"quote \\"1\\"": "v", "nested": {"inner": 1}, "last" : tr', ['quote "1"', 'nested', 'last']),
+        ('{"tags": ["a:", "b"], "dangling"', ['tags']),
+    ]
+    for candidate, expected in key_cases:
+        keys = response_repair.top_level_keys(candidate)
+        passed = keys == expected
+        failures += not passed
+        print(f"{candidate!r} -> {keys!r}: {'PASS' if passed else f'FAIL: expected {expected!r}'}")
+
+    print("\n" + "=" * 80)
+    print(f"ALL TESTS COMPLETED ({failures} failed)")
+    print("=" * 80)
+    sys.exit(1 if failures else 0)
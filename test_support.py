@@ -0,0 +1,106 @@
+"""
+Shared helpers for the test scripts
+Generated PDFs, a scratch directory for everything the app writes, and recorded model responses
+"""
+
+import os
+import json
+import zlib
+import random
+import tempfile
+
+WORDS = (
+    "the of and to in a is that for on with as by this we are from be results study "
+    "model data analysis method effect participants significant were group"
+).split()
+
+
+def make_pdf(pages, lines_per_page=1):
+    """
+    A PDF with one page per entry of `pages`.
+
+    An entry is the page's text, or an int to fill the page with that many
+    lines of random words (for large, text-heavy documents).
+    """
+    rng = random.Random(1)
+    objects = [None, None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for page in pages:
+        lines = [page] if isinstance(page, str) else [" ".join(rng.choice(WORDS) for _ in range(12)) for _ in range(page)]
+        content = "\n".join(f"BT /F1 10 Tf 50 {780 - i * 14} Td ({line}) Tj ET" for i, line in enumerate(lines))
+        stream = zlib.compress(content.encode('latin-1'))
+        objects.append(b"<< /Length %d /Filter /FlateDecode >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Resources << /Font << /F1 3 0 R >> >> "
+            f"/Contents {len(objects)} 0 R >>".encode()
+        )
+        kids.append(len(objects))
+    objects[0] = b"<< /Type /Catalog /Pages 2 0 R >>"
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(f'{kid} 0 R' for kid in kids)}] /Count {len(kids)} >>".encode()
+
+    pdf = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(pdf))
+        pdf += f"{number} 0 obj\n".encode() + body + b"\nendobj\n"
+    xref = len(pdf)
+    pdf += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    pdf += b"".join(f"{offset:010d} 00000 n \n".encode() for offset in offsets)
+    pdf += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return pdf
+
+
+def scratch_environment(**settings):
+    """
+    Point everything the app writes at a new temporary directory and replay recorded responses.
+
+    Call before importing app; returns the directory. Extra settings
+    override the defaults, e.g. scratch_environment(MEMORY_BUDGET_MB='1').
+    """
+    work_dir = tempfile.mkdtemp(prefix='paper_analyzer_test_')
+    os.environ.update({
+        'LLM_PROVIDER': 'recorded',
+        'LLM_BACKUP_PROVIDER': '',
+        'RECORDED_RESPONSES_DIR': os.path.join(work_dir, 'recorded'),
+        'RESULTS_DIR': os.path.join(work_dir, 'results'),
+        'USAGE_LEDGER_PATH': os.path.join(work_dir, 'usage_ledger.db'),
+        'TRACES_FILE': os.path.join(work_dir, 'traces.jsonl'),
+        'PAPER_INDEX_DIR': os.path.join(work_dir, 'paper_index'),
+        'RELATED_PAPERS': 'false',
+        'DAILY_BUDGET_USD': '0',
+    })
+    os.environ.update(settings)
+    return work_dir
+
+
+def record(directory, content, latency=0, name='default', usage=None):
+    """Write a recorded response; `content` may be an analysis dict, sent as a JSON code block."""
+    if isinstance(content, dict):
+        content = f"```json\n{json.dumps(content)}\n```"
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, f'{name}.json'), 'w', encoding='utf-8') as file:
+        json.dump({
+            'content': content,
+            'usage': usage or {'prompt_tokens': 1000, 'completion_tokens': 200},
+            'latency': latency
+        }, file)
+
+
+class Checks:
+    """Counts failed checks and prints one PASS/FAIL line per check."""
+
+    def __init__(self):
+        self.failures = 0
+
+    def check(self, name, passed):
+        self.failures += not passed
+        print(f"{name}: {'PASS' if passed else 'FAIL'}")
+
+    def section(self, title):
+        print("\n" + "=" * 80)
+        print(title)
+        print("=" * 80)
+
+    def finish(self):
+        self.section(f"ALL TESTS COMPLETED ({self.failures} failed)")
+        return 1 if self.failures else 0
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Test script for the text-only upload path (/api/analyze-text) and reuse of stored results
+Checks the gzip size bound, the fallback to a PDF upload, and when a stored result may be served again
+"""
+
+import os
+import sys
+import gzip
+import json
+import shutil
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend', 'api'))
+
+from test_support import scratch_environment, record, Checks, WORDS
+
+
+def post_text(client, body, mode='single', gzipped=False):
+    headers = {'Content-Encoding': 'gzip'} if gzipped else {}
+    response = client.post(f'/api/analyze-text?mode={mode}', data=body, content_type='text/plain', headers=headers)
+    return response.status_code, response.get_json()
+
+
+def paper(topic, words=3000):
+    """Prose-like paper text, pages separated by form feeds."""
+    text = " ".join(WORDS[i % len(WORDS)] for i in range(words))
+    return f"A study of {topic}. {text}\f{text}"
+
+
+def model_calls():
+    connection = usage_ledger._connect()
+    try:
+        return connection.execute('SELECT COUNT(*) FROM usage').fetchone()[0]
+    finally:
+        connection.close()
+
+
+if __name__ == '__main__':
+    work_dir = scratch_environment(MAX_TEXT_SIZE=str(256 * 1024))
+
+    import app
+    import usage_ledger
+
+    recorded_dir = os.environ['RECORDED_RESPONSES_DIR']
+    _, sections = app.split_prompt_sections(app.load_prompt_template())
+    full = {key: f"Recorded content of {key}" for key, _ in sections}
+    record(recorded_dir, full)
+    client = app.app.test_client()
+    checks = Checks()
+
+    checks.section("TEST 1: Gzip-compressed Text")
+    text = paper("reading")
+    status, body = post_text(client, gzip.compress(text.encode('utf-8')), gzipped=True)
+    print(f"Status: {status}, sections: {len(body.get('sections', []))}")
+    checks.check("Analyzed", status == 200 and body['sections'] == list(full) and not body['cached'])
+
+    checks.section("TEST 2: Size Bound Applies After Decompression")
+    bomb = gzip.compress(b"a" * (app.MAX_TEXT_SIZE * 4))
+    status, body = post_text(client, bomb, gzipped=True)
+    print(f"{len(bomb)} compressed bytes -> status {status}: {body.get('error')}")
+    checks.check("Small body that expands past MAX_TEXT_SIZE gets a 413", status == 413)
+    status, body = post_text(client, paper("size", words=60000).encode('utf-8'))
+    checks.check("Uncompressed text over MAX_TEXT_SIZE gets a 413", status == 413)
+    status, body = post_text(client, b"not gzip at all", gzipped=True)
+    checks.check("Invalid gzip gets a 400", status == 400 and body['error'] == 'Invalid gzip body')
+    status, body = post_text(client, "café ".encode('latin-1') * 100)
+    checks.check("Text that isn't UTF-8 gets a 400", status == 400)
+
+    checks.section("TEST 3: Garbled Text Falls Back to a PDF Upload")
+    garbled = "\f".join("(cid:12)(cid:40)(cid:7) ��" * 40 for _ in range(5))
+    calls = model_calls()
+    status, body = post_text(client, garbled.encode('utf-8'))
+    print(f"Status: {status}, body: {body}")
+    checks.check("422 asking for the PDF", status == 422 and body.get('fallback') == 'pdf')
+    checks.check("No model call made", model_calls() == calls)
+
+    checks.section("TEST 4: Identical Text Is Served From the Store")
+    calls = model_calls()
+    status, body = post_text(client, text.encode('utf-8'))
+    checks.check("Same text, plain this time, served from the store", status == 200 and body['cached'] and body['provider'] == 'cache')
+    checks.check("No model call made", model_calls() == calls)
+    status, body = post_text(client, text.encode('utf-8'), mode='parallel')
+    checks.check("Other analysis mode is analyzed again", status == 200 and not body['cached'])
+
+    checks.section("TEST 5: Changed Prompt or Models Are Analyzed Again")
+    load_prompt_template = app.load_prompt_template
+    app.load_prompt_template = lambda: load_prompt_template() + "\nKeep every section under 200 words."
+    status, body = post_text(client, text.encode('utf-8'))
+    checks.check("Edited prompt.md: not served from the store", status == 200 and not body['cached'])
+    app.load_prompt_template = load_prompt_template
+    status, body = post_text(client, text.encode('utf-8'))
+    checks.check("Original prompt: stored result served again", status == 200 and body['cached'])
+
+    default_model = app.MODEL_TIERS['default']['model']
+    app.MODEL_TIERS['default']['model'] = 'gpt-5'
+    status, body = post_text(client, text.encode('utf-8'))
+    checks.check("Changed model: not served from the store", status == 200 and not body['cached'])
+    app.MODEL_TIERS['default']['model'] = default_model
+
+    app.LLM_PROVIDER = 'compatible'
+    app.llm_providers._providers['compatible'] = app.llm_providers.RecordedProvider('compatible', recorded_dir)
+    status, body = post_text(client, text.encode('utf-8'))
+    checks.check("Changed provider: not served from the store", status == 200 and not body['cached'])
+    app.LLM_PROVIDER = 'recorded'
+
+    checks.section("TEST 6: Incomplete Results Are Not Reused")
+    # Cut off inside section 3, and the continuation call gets the same cut-off reply
+    record(recorded_dir, json.dumps({key: full[key] for key in list(full)[:3]})[:-10])
+    incomplete = paper("attention")
+    status, body = post_text(client, incomplete.encode('utf-8'))
+    print(f"Status: {status}, recovery: {body.get('recovery')}")
+    checks.check("Missing sections marked", status == 200 and app.SECTION_MISSING.strip('*') in body['markdown'])
+    record(recorded_dir, full)
+    status, body = post_text(client, incomplete.encode('utf-8'))
+    checks.check("Sent again: analyzed again, not served from the store", status == 200 and not body['cached'])
+    status, body = post_text(client, incomplete.encode('utf-8'))
+    checks.check("Complete result is reused", status == 200 and body['cached'])
+
+    status = checks.finish()
+    shutil.rmtree(work_dir, ignore_errors=True)
+    sys.exit(status)
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Test script for request tracing and the /api/traces endpoint
+Checks that analyses are traced stage by stage and how the endpoint validates its parameters
+"""
+
+import os
+import sys
+import shutil
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend', 'api'))
+
+from test_support import scratch_environment, record, Checks, WORDS
+
+
+def traces(client, query=''):
+    response = client.get(f'/api/traces{query}')
+    return response.status_code, response.get_json()
+
+
+if __name__ == '__main__':
+    work_dir = scratch_environment()
+
+    import app
+
+    _, sections = app.split_prompt_sections(app.load_prompt_template())
+    record(os.environ['RECORDED_RESPONSES_DIR'], {key: f"Recorded content of {key}" for key, _ in sections})
+    client = app.app.test_client()
+    checks = Checks()
+
+    checks.section("TEST 1: Analyses Are Traced")
+    for words in (2000, 4000):
+        text = " ".join(WORDS[i % len(WORDS)] for i in range(words))
+        response = client.post('/api/analyze-text?mode=single', data=text.encode('utf-8'), content_type='text/plain')
+    trace_id = response.headers.get('X-Trace-Id')
+    status, body = traces(client, '?stage=llm_call')
+    print(f"Status: {status}, traces: {[trace['trace_id'] for trace in body.get('traces', [])]}")
+    checks.check("Both analyses listed by their model call", status == 200 and len(body['traces']) == 2)
+    checks.check("Slowest first", body['traces'][0]['duration_ms'] >= body['traces'][1]['duration_ms'])
+    status, body = traces(client, f'?trace_id={trace_id}')
+    checks.check("Full trace found by its id", status == 200 and body['trace_id'] == trace_id and body['spans'])
+    status, body = traces(client, '?trace_id=unknown')
+    checks.check("Unknown trace id gets a 404", status == 404)
+
+    checks.section("TEST 2: Parameters")
+    status, body = traces(client, '?limit=1')
+    checks.check("limit caps the list", status == 200 and len(body['traces']) == 1)
+    status, body = traces(client, '?window=1')
+    checks.check("window only considers the most recent traces", status == 200 and len(body['traces']) == 1)
+    for query in ('?limit=0', '?limit=-5', '?window=0', '?window=-1'):
+        status, body = traces(client, query)
+        checks.check(f"{query} gets a 400", status == 400 and 'at least 1' in body['error'])
+    status, body = traces(client, '?limit=ten')
+    checks.check("Non-integer limit gets a 400", status == 400)
+
+    status = checks.finish()
+    shutil.rmtree(work_dir, ignore_errors=True)
+    sys.exit(status)
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Test script for the token usage ledger and budget-driven routing
+Checks pricing per provider, rollups, migration of old ledgers and the budget modes
+"""
+
+import os
+import sys
+import shutil
+import sqlite3
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend', 'api'))
+
+from test_support import scratch_environment, record, Checks, WORDS
+
+
+def analyze_text(client, text):
+    response = client.post('/api/analyze-text?mode=single', data=text.encode('utf-8'), content_type='text/plain')
+    return response.status_code, response.get_json()
+
+
+def last_model():
+    connection = usage_ledger._connect()
+    try:
+        return connection.execute('SELECT model FROM usage ORDER BY rowid DESC LIMIT 1').fetchone()[0]
+    finally:
+        connection.close()
+
+
+if __name__ == '__main__':
+    work_dir = scratch_environment()
+
+    import app
+    import usage_ledger
+    from llm_providers import Usage
+
+    checks = Checks()
+
+    checks.section("TEST 1: Pricing")
+    cost = usage_ledger.estimate_cost('openai', 'gpt-5-mini', 1_000_000, 0, 1_000_000)
+    checks.check("OpenAI input and output priced per model", abs(cost - 2.25) < 1e-9)
+    cost = usage_ledger.estimate_cost('openai', 'gpt-5-mini', 1_000_000, 1_000_000, 0)
+    checks.check("Cached input priced at the cached rate", abs(cost - 0.025) < 1e-9)
+    cost = usage_ledger.estimate_cost('openai', 'some-new-model', 1_000_000, 0, 0)
+    checks.check("Unknown OpenAI model priced as gpt-5", abs(cost - 1.25) < 1e-9)
+    checks.check("Recorded responses are free", usage_ledger.estimate_cost('recorded', 'gpt-5', 10**6, 0, 10**6) == 0)
+    usage_ledger.PROVIDER_PRICES_PER_1M['compatible'] = 0.5
+    cost = usage_ledger.estimate_cost('compatible', 'llama', 1_000_000, 0, 1_000_000)
+    checks.check("Compatible server priced at COMPATIBLE_PRICE_PER_1M", abs(cost - 1.0) < 1e-9)
+    usage_ledger.PROVIDER_PRICES_PER_1M['compatible'] = 0.0
+
+    checks.section("TEST 2: Recording and Rollups")
+    usage_ledger.current_client.set('client-a')
+    usage_ledger.record('openai', 'gpt-5-mini', 'analysis', Usage(prompt_tokens=1000, completion_tokens=200, cached_tokens=500), 1.5)
+    usage_ledger.record('recorded', 'gpt-5-mini', 'analysis', Usage(prompt_tokens=1000, completion_tokens=200), 0.1)
+    usage_ledger.record('openai', 'gpt-5-mini', 'analysis', None, 0.2)
+    rows = {(row['client_id'], row['provider']): row for row in usage_ledger.rollup()}
+    print(f"Rollup: {list(rows.values())}")
+    checks.check("One rollup row per client and provider", set(rows) == {('client-a', 'openai'), ('client-a', 'recorded')})
+    checks.check("Calls without usage still counted", rows[('client-a', 'openai')]['calls'] == 2)
+    checks.check("Token totals summed", rows[('client-a', 'openai')]['cached_tokens'] == 500)
+    checks.check("Only OpenAI calls cost money", rows[('client-a', 'recorded')]['cost_usd'] == 0 and rows[('client-a', 'openai')]['cost_usd'] > 0)
+
+    checks.section("TEST 3: Ledgers From Before the Provider Column")
+    old_path = os.path.join(work_dir, 'old_ledger.db')
+    connection = sqlite3.connect(old_path)
+    connection.execute("""
+        CREATE TABLE usage (timestamp TEXT NOT NULL, day TEXT NOT NULL, client_id TEXT NOT NULL,
+                            model TEXT NOT NULL, purpose TEXT NOT NULL, prompt_tokens INTEGER NOT NULL,
+                            cached_tokens INTEGER NOT NULL, completion_tokens INTEGER NOT NULL,
+                            latency_ms REAL NOT NULL, cost_usd REAL NOT NULL)
+    """)
+    connection.execute("INSERT INTO usage VALUES ('2020-01-01T00:00:00', '2020-01-01', 'old', 'gpt-5', 'analysis', 1, 0, 1, 1, 0.01)")
+    connection.commit()
+    connection.close()
+    usage_ledger.LEDGER_PATH, usage_ledger._initialized = old_path, False
+    usage_ledger.record('openai', 'gpt-5', 'analysis', Usage(prompt_tokens=10, completion_tokens=10), 0.1)
+    connection = sqlite3.connect(old_path)
+    providers = [row[0] for row in connection.execute('SELECT provider FROM usage ORDER BY rowid')]
+    connection.close()
+    checks.check("Old rows migrated as OpenAI, new rows recorded", providers == ['openai', 'openai'])
+    usage_ledger.LEDGER_PATH = os.environ['USAGE_LEDGER_PATH']
+
+    checks.section("TEST 4: Budget Modes")
+    _, sections = app.split_prompt_sections(app.load_prompt_template())
+    record(os.environ['RECORDED_RESPONSES_DIR'], {key: f"Recorded content of {key}" for key, _ in sections})
+    client = app.app.test_client()
+    paper = " ".join(WORDS[i % len(WORDS)] for i in range(20000))
+    usage_ledger.DAILY_BUDGET_USD = 1.0
+    spent = usage_ledger.spent_today()
+
+    def spend(target):
+        """Add calls until today's spend reaches `target` USD."""
+        global spent
+        tokens = int((target - spent) / 10.0 * 1_000_000)
+        usage_ledger.record('openai', 'gpt-5', 'test', Usage(completion_tokens=tokens), 0)
+        spent = usage_ledger.spent_today()
+
+    spend(0.5)
+    status, body = analyze_text(client, paper + " normal")
+    checks.check("Under 80%: normal mode on the default model", body['budget']['mode'] == 'normal' and last_model() == app.MODEL_TIERS['default']['model'])
+
+    spend(0.85)
+    status, body = analyze_text(client, paper + " cheaper")
+    checks.check("Over 80%: cheaper model", body['budget']['mode'] == 'cheaper_model' and last_model() == app.MODEL_TIERS['fast']['model'])
+
+    spend(0.96)
+    reduce_text, reduced = app.reduce_text, []
+    app.reduce_text = lambda text, *args: reduced.append(len(text)) or reduce_text(text, *args)
+    status, body = analyze_text(client, paper + " reduced")
+    app.reduce_text = reduce_text
+    checks.check("Over 95%: cheaper model", body['budget']['mode'] == 'reduced_text' and last_model() == app.MODEL_TIERS['fast']['model'])
+    checks.check("Over 95%: paper text reduced", len(reduced) == 1 and reduced[0] > app.REDUCED_TEXT_CHARS)
+
+    usage_ledger.DAILY_BUDGET_USD = 0
+    checks.check("A budget of 0 disables routing", usage_ledger.budget_status()['mode'] == 'normal')
+
+    status = checks.finish()
+    shutil.rmtree(work_dir, ignore_errors=True)
+    sys.exit(status)